@@ -0,0 +1,60 @@
+# バッチエンジン (idol_engine.batch) の検証と計測
+#   1. 分布の一致: FastGameState と平均スコアを比べ、差を標準誤差で割った z 値を出す
+#      (乱数の使い方が違うのでゲーム単位では一致しない。|z| が 3 を超えたら要確認)
+#   2. 速度: games/s (FastGameState / バッチ)
+#   python benchmarks/batch_engine.py [--fast-games 20000] [--batch-games 100000]
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idol_engine import get_template_decks
+from idol_engine.batch import BATCH_POLICIES, compile_batch_loadout, run_batch
+from idol_sim import build_loadout, game_runner
+
+CASES = (
+    ((), ()),
+    ((), ("センブリソーダ", "ブーストエキス")),
+    (("大荷物", "Tシャツ", "きっかけ"), ("センブリソーダ",)),
+)
+
+def compare(loadout, policy_name, fast_games, batch_games, seed=0):
+    play = game_runner(loadout, policy_name, 'fast')
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    a = np.array([play(rng) for _ in range(fast_games)])
+    fast_rate = fast_games / (time.perf_counter() - t0)
+    blo = compile_batch_loadout(loadout)
+    t0 = time.perf_counter()
+    b = run_batch(blo, batch_games, np.random.default_rng(seed), policy_name)
+    batch_rate = batch_games / (time.perf_counter() - t0)
+    z = (a.mean() - b.mean()) / np.sqrt(a.var() / len(a) + b.var() / len(b))
+    return a.mean(), b.mean(), z, fast_rate, batch_rate
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="バッチエンジンの分布確認と速度計測")
+    parser.add_argument('--deck', default="理想")
+    parser.add_argument('--fast-games', type=int, default=20000)
+    parser.add_argument('--batch-games', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    deck_list = get_template_decks()[args.deck]
+
+    print(f"{'policy':<8}{'items/drinks':<40}{'fast mean':>11}{'batch mean':>12}{'z':>7}{'fast g/s':>10}{'batch g/s':>11}")
+    worst = 0.0
+    for policy_name in BATCH_POLICIES:
+        for item_names, drink_names in CASES:
+            loadout = build_loadout(deck_list, 'shuki_kotone', item_names, drink_names)
+            fa, ba, z, fr, br = compare(loadout, policy_name, args.fast_games, args.batch_games, args.seed)
+            label = "+".join(item_names + drink_names) or "-"
+            print(f"{policy_name:<8}{label:<40}{fa:>11,.0f}{ba:>12,.0f}{z:>+7.2f}{fr:>10,.0f}{br:>11,.0f}")
+            worst = max(worst, abs(z))
+    return worst
+
+if __name__ == "__main__":
+    sys.exit(1 if main() > 3 else 0)
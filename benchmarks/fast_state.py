@@ -0,0 +1,64 @@
+# FastGameState の検証と計測
+#   1. 一致確認: Pアイテム・ドリンクの組み合わせと方針ごとに、GameState と同じ乱数で同じスコアになるか
+#   2. 速度: 1ゲームあたりの時間 (GameState / FastGameState)
+#   python benchmarks/fast_state.py [--games 40] [--timing-games 1000]
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idol_engine import get_all_p_items, get_all_drinks, get_template_decks
+from idol_sim import POLICIES, build_loadout, check_parity, game_runner
+
+def parity(deck_list, n_games, seed=0):
+    """全組み合わせで check_parity を回し、食い違いの総数を返す"""
+    items = list(get_all_p_items())
+    drinks = list(get_all_drinks())
+    drink_sets = [()] + [(d,) for d in drinks] + [tuple(drinks)] + [tuple(drinks) * 2]
+    checked = bad = 0
+    for policy_name in sorted(POLICIES):
+        for k in range(3):
+            for item_names in itertools.combinations(items, k):
+                for drink_names in drink_sets:
+                    mismatches = check_parity(deck_list, n_games, seed, 'shuki_kotone', item_names, drink_names, policy_name)
+                    checked += n_games
+                    bad += len(mismatches)
+                    for i, a, b in mismatches[:3]:
+                        print(f"  mismatch {policy_name} {item_names} {drink_names} game {i}: {a} != {b}")
+    return checked, bad
+
+def per_game_us(play, n_games, repeat=5, seed=0):
+    best = float('inf')
+    for r in range(repeat):
+        rng = random.Random(seed)
+        t0 = time.perf_counter()
+        for _ in range(n_games): play(rng)
+        best = min(best, (time.perf_counter() - t0) / n_games * 1e6)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FastGameState の一致確認と速度計測")
+    parser.add_argument('--deck', default="理想")
+    parser.add_argument('--games', type=int, default=40, help="組み合わせごとの一致確認ゲーム数")
+    parser.add_argument('--timing-games', type=int, default=1000)
+    parser.add_argument('--drinks', nargs='*', default=["センブリソーダ", "ブーストエキス"])
+    args = parser.parse_args(argv)
+    deck_list = get_template_decks()[args.deck]
+
+    checked, bad = parity(deck_list, args.games)
+    print(f"parity: {checked:,} games, {bad} mismatches")
+
+    loadout = build_loadout(deck_list, 'shuki_kotone', (), args.drinks)
+    print(f"{'policy':<8}{'object us':>11}{'fast us':>10}{'speedup':>9}")
+    for policy_name in sorted(POLICIES):
+        slow = per_game_us(game_runner(loadout, policy_name, 'object'), args.timing_games)
+        fast = per_game_us(game_runner(loadout, policy_name, 'fast'), args.timing_games)
+        print(f"{policy_name:<8}{slow:>11.0f}{fast:>10.0f}{slow / fast:>8.2f}x")
+    return bad
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
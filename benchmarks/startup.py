@@ -0,0 +1,72 @@
+# 起動コストの計測: モジュールごとの import 時間と、それだけを読み込んだプロセスの RSS
+#   各モジュールは新しいインタプリタで読み込むので、既に読み込み済みのキャッシュの影響を受けない。
+#   python benchmarks/startup.py            (表形式)
+#   python benchmarks/startup.py --json     (1行 JSON)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (表示名, import 文)。先頭は比較用の素のインタプリタ
+TARGETS = (
+    ("python", "pass"),
+    ("idol_engine", "import idol_engine"),
+    ("idol_sim", "import idol_sim"),
+    ("idol_ai", "import idol_ai"),
+    ("matplotlib", "from matplotlib.figure import Figure"),
+    ("streamlit", "import streamlit"),
+    ("idol_game deps", "import streamlit, idol_ai, idol_assets; from matplotlib.figure import Figure"),
+)
+
+_PROBE = """
+import resource, sys, time
+t0 = time.perf_counter()
+{stmt}
+t1 = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print((t1 - t0) * 1000.0, rss * (1 if sys.platform == 'darwin' else 1024) / 2**20, len(sys.modules))
+"""
+
+def measure(stmt, repeat=5):
+    """新しいプロセスで stmt を repeat 回実行し、{'ms', 'rss_mb', 'modules'} を返す (中央値)"""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(stmt=stmt)], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        runs.append((float(out[0]), float(out[1]), int(out[2])))
+    return {
+        'ms': statistics.median(r[0] for r in runs),
+        'rss_mb': statistics.median(r[1] for r in runs),
+        'modules': runs[0][2],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="import 時間とプロセスごとのメモリを計測する")
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, stmt in TARGETS:
+        try:
+            results[name] = measure(stmt, args.repeat)
+        except subprocess.CalledProcessError:
+            results[name] = None  # 未インストール
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+        return results
+    base = results['python']
+    print(f"{'target':<16}{'import ms':>11}{'RSS MB':>9}{'+RSS MB':>9}{'modules':>9}")
+    for name, r in results.items():
+        if r is None:
+            print(f"{name:<16}{'(not installed)':>38}")
+            continue
+        print(f"{name:<16}{r['ms']:>11.1f}{r['rss_mb']:>9.1f}{r['rss_mb'] - base['rss_mb']:>9.1f}{r['modules']:>9}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# ベンチマーク一式と基準値 (baseline.json) との比較
+#   各ベンチマークは固定シードで同じ処理を繰り返し、ops/s (repeat 回中の最良) と
+#   1バッチ実行中に tracemalloc で見たメモリのピーク (KiB)・1回あたりの確保ブロック数を出す。
+#   基準値より ops/s が tolerance 以上遅い / ピークが tolerance 以上大きいものを回帰として終了コード 1 を返す。
+#   マシンの速さの揺れ (他の負荷・クロックの変化) を打ち消すため、速さは計測の前後に回す
+#   純 Python の較正ループとの比 (ops_per_cal) で比べ、回帰に見えたものは計り直して2回とも遅いときだけ回帰とする。
+#   基準値は計測したマシン依存なので、別のマシンでは最初に --update で取り直す。
+#   python benchmarks/suite.py                 (全部を計測して基準値と比較)
+#   python benchmarks/suite.py --only game     (名前に game を含むものだけ)
+#   python benchmarks/suite.py --update        (基準値を書き換える)
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DECK = "理想"
+DRINKS = ("センブリソーダ", "ブーストエキス")
+
+# ==========================================
+# 1. ベンチマーク本体
+# ==========================================
+# 各関数は (op, ops_per_call) を返す。op() を1回呼ぶと ops_per_call 回分の処理をする。
+def _loadout():
+    from idol_engine import get_template_decks
+    from idol_sim import build_loadout
+    return build_loadout(get_template_decks()[DECK], 'shuki_kotone', (), DRINKS)
+
+def bench_construct():
+    from idol_engine import GameState
+    char, deck, p_items, drinks = _loadout()
+    rng = random.Random(0)
+    return (lambda: GameState(char, deck, p_items, drinks=drinks, verbose=False, rng=rng)), 1
+
+def _bench_game(policy_name, engine):
+    from idol_sim import game_runner
+    play = game_runner(_loadout(), policy_name, engine)
+    rng = random.Random(0)
+    return (lambda: play(rng)), 1
+
+def bench_game_random(): return _bench_game('random', 'object')
+def bench_game_first(): return _bench_game('first', 'object')
+def bench_fast_game_first(): return _bench_game('first', 'fast')
+
+def bench_game_greedy(): return _bench_game('greedy', 'object')  # 1手ごとに全候補を snapshot / restore で試す
+
+def _started_state():
+    from idol_engine import GameState
+    char, deck, p_items, drinks = _loadout()
+    s = GameState(char, deck, p_items, drinks=drinks, verbose=False, rng=random.Random(0))
+    s.start_turn()
+    return s
+
+def bench_calculate_score():
+    s = _started_state()
+    s.buffs['good_condition'] = 3; s.buffs['super_good'] = 2; s.concentration = 12
+    calc = s.calculate_score
+    def op():
+        for _ in range(1000): calc(10, 1.5)
+    return op, 1000
+
+def bench_draw_cards():
+    # 手札を毎回捨て札に戻して5枚引く。山札は数回で尽きるので、シャッフルも一定の割合で入る
+    s = _started_state()
+    def op():
+        for _ in range(200):
+            s.discard.extend(s.hand); s.hand = []
+            s.draw_cards(5)
+    return op, 200
+
+def bench_import_engine():
+    # 新しいインタプリタで import するので、インタプリタの起動時間も含む (startup.py と同じ計測)
+    from startup import measure
+    def op(): measure("import idol_engine", repeat=1)
+    return op, 1
+
+def _apptest():
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(os.path.join(ROOT, "idol_game.py"), default_timeout=60)
+
+def bench_ui_setup():
+    # 新しいセッションでの setup_screen の描画 (カードプールのグリッド込み)
+    at = _apptest()
+    at.run()
+    return at.run, 1
+
+def bench_ui_playing():
+    at = _apptest()
+    at.run()
+    for sb in at.selectbox:
+        if DECK in sb.options: sb.select(DECK)
+    next(b for b in at.button if b.label == "読込").click()
+    at.run()
+    next(b for b in at.button if b.label == "ゲーム開始").click()
+    at.run()
+    if at.session_state.game_state != 'playing': raise RuntimeError("game did not start")
+    return at.run, 1
+
+# (名前, 関数, 計測の繰り返し回数, 1計測あたりの op 呼び出し回数)
+BENCHMARKS = (
+    ("import_engine", bench_import_engine, 5, 1),
+    ("construct", bench_construct, 5, 500),
+    ("game_random", bench_game_random, 5, 100),
+    ("game_first", bench_game_first, 5, 100),
+    ("game_greedy", bench_game_greedy, 5, 20),
+    ("fast_game_first", bench_fast_game_first, 5, 100),
+    ("calculate_score", bench_calculate_score, 5, 20),
+    ("draw_cards", bench_draw_cards, 5, 20),
+    ("ui_setup", bench_ui_setup, 3, 2),
+    ("ui_playing", bench_ui_playing, 3, 2),
+)
+
+# ==========================================
+# 2. 計測と比較
+# ==========================================
+def calibration_seconds(n=200_000):
+    """リポジトリのコードに依存しない純 Python のループの時間 (マシンのその時点の速さの目安)"""
+    t0 = time.perf_counter()
+    total = 0
+    for i in range(n): total += i * i % 7
+    return time.perf_counter() - t0
+
+def measure(fn, repeat, calls):
+    op, per_call = fn()
+    op()  # ウォームアップ (キャッシュ・遅延 import を計測から外す)
+    n_ops = calls * per_call
+    best = float('inf')
+    best_rel = 0.0
+    for _ in range(repeat):
+        cal = calibration_seconds()
+        t0 = time.perf_counter()
+        for _ in range(calls): op()
+        elapsed = time.perf_counter() - t0
+        cal = (cal + calibration_seconds()) / 2
+        best = min(best, elapsed)
+        best_rel = max(best_rel, n_ops / elapsed * cal)
+    tracemalloc.start()
+    base_blocks = sum(st.count for st in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.reset_peak()
+    for _ in range(calls): op()
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = sum(st.count for st in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    return {'ops_per_sec': n_ops / best, 'us_per_op': best / n_ops * 1e6, 'ops_per_cal': best_rel,
+            'peak_kb': peak / 1024, 'blocks_per_op': (blocks - base_blocks) / n_ops}
+
+def speed_key(r, b):
+    """速さを比べる項目 (両方に較正比があればそれ、なければ ops/s)"""
+    return 'ops_per_cal' if 'ops_per_cal' in r and 'ops_per_cal' in b else 'ops_per_sec'
+
+def compare(results, baseline, tolerance):
+    """[(name, 項目, 基準値, 今回)] の回帰リスト"""
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b: continue
+        key = speed_key(r, b)
+        if r[key] < b[key] * (1 - tolerance):
+            regressions.append((name, key, b[key], r[key]))
+        if r['peak_kb'] > b['peak_kb'] * (1 + tolerance) + 64:
+            regressions.append((name, 'peak_kb', b['peak_kb'], r['peak_kb']))
+    return regressions
+
+def load_baseline(path):
+    if not os.path.exists(path): return {}
+    with open(path, encoding='utf-8') as f: return json.load(f).get('results', {})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ベンチマークを実行して基準値と比較する")
+    parser.add_argument('--only', nargs='*', default=[], help="名前にこの文字列を含むものだけ実行")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="回帰とみなす比率 (既定 25%%)")
+    parser.add_argument('--update', action='store_true', help="今回の結果で基準値を書き換える")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    specs = {name: (fn, repeat, calls) for name, fn, repeat, calls in BENCHMARKS}
+    results = {}
+    for name, (fn, repeat, calls) in specs.items():
+        if args.only and not any(k in name for k in args.only): continue
+        try:
+            results[name] = measure(fn, repeat, calls)
+        except ImportError as e:
+            print(f"{name}: skipped ({e})", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions and not args.update:
+        # 一時的な負荷による誤検出を減らすため、回帰に見えたものだけ計り直して良い方を残す
+        for name in dict.fromkeys(name for name, *_ in regressions):
+            again = measure(*specs[name])
+            results[name] = max(results[name], again, key=lambda r: r[speed_key(r, baseline[name])])
+        regressions = compare(results, baseline, args.tolerance)
+
+    if args.json: print(json.dumps({'results': results, 'regressions': regressions}, ensure_ascii=False))
+    else:
+        print(f"{'benchmark':<18}{'ops/s':>12}{'us/op':>11}{'peak KiB':>10}{'blocks/op':>10}{'vs base':>9}")
+        for name, r in results.items():
+            b = baseline.get(name)
+            ratio = f"{r[speed_key(r, b)] / b[speed_key(r, b)]:>8.2f}x" if b else f"{'-':>9}"
+            print(f"{name:<18}{r['ops_per_sec']:>12,.1f}{r['us_per_op']:>11.1f}{r['peak_kb']:>10.1f}{r['blocks_per_op']:>10.1f}{ratio}")
+        for name, key, b, r in regressions:
+            print(f"REGRESSION {name} {key}: baseline {b:,.1f} -> {r:,.1f}")
+
+    if args.update:
+        merged = dict(baseline, **results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': merged},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        return 0
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# 探索ベースの自動プレイヤー (決定化 + オープンループ MCTS)
+#   山札の並びと未確定のターンスケジュールを毎回サンプリングし、最終スコアの期待値が
+#   最大になる行動 (手札idx / ドリンクidx / ターン終了) を選ぶ。
+import collections
+import math
+import random
+import time
+
+# ==========================================
+# 1. 行動キー
+# ==========================================
+# 木のノードは手札の位置ではなく「どのカード/ドリンクか」で行動を区別する。
+# 山札がサンプルごとに変わっても、同じ名前の行動は同じ子ノードに集約される。
+def action_key(state, action):
+    if action[0] == 'card': return ('card', state.hand[action[1]].name)
+    if action[0] == 'drink': return ('drink', state.drinks[action[1]].name)
+    return ('end',)
+
+def legal_keys(state):
+    keys = {}
+    for a in state.legal_actions():
+        keys.setdefault(action_key(state, a), a)
+    return keys
+
+def describe_action(state, action):
+    if action[0] == 'card': return f"【{state.hand[action[1]].name}】を使用"
+    if action[0] == 'drink': return f"{state.drinks[action[1]].name}を使用"
+    return "ターン終了"
+
+# ==========================================
+# 2. 決定化
+# ==========================================
+FIXED_SLOTS = (0, 9, 10, 11)
+
+def determinize(state, rng, sample_schedule=True):
+    """隠れ情報 (山札の順番・未来の可変ターン) をサンプリングする"""
+    rng.shuffle(state.deck)
+    if sample_schedule:
+        slots = [i for i in range(state.turn, len(state.turn_info)) if i not in FIXED_SLOTS]
+        genres = [state.turn_info[i] for i in slots]
+        rng.shuffle(genres)
+        for i, g in zip(slots, genres): state.turn_info[i] = g
+
+def rollout_action(state, rng):
+    """プレイアウト用の軽い方針: 使えるカードをランダムに、ドリンクは最大倍率のターンに使う"""
+    actions = state.legal_actions()
+    cards = [a for a in actions if a[0] == 'card']
+    if cards: return rng.choice(cards)
+    if len(actions) > 1 and state.turn_info[state.turn-1]['weight'] == max(t['weight'] for t in state.turn_info):
+        return actions[0]
+    return ('end',)
+
+def rollout(state, rng, max_actions=500):
+    for _ in range(max_actions):
+        if state.is_game_over(): break
+        if not state.apply_action(rollout_action(state, rng)): state.apply_action(('end',))
+    return state.score
+
+# ==========================================
+# 3. 置換表 (transposition table)
+# ==========================================
+class TranspositionTable:
+    """GameState.state_key() -> [サンプル数, 獲得スコア合計] を保持する容量制限付き LRU"""
+    def __init__(self, capacity=200_000):
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def add(self, key, gain):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [0, 0.0]
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        entry[0] += 1
+        entry[1] += gain
+        return entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries), 'capacity': self.capacity,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+# ==========================================
+# 4. 探索木
+# ==========================================
+class Node:
+    __slots__ = ('visits', 'total', 'children')
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}
+
+    def mean(self):
+        return self.total / self.visits if self.visits else 0.0
+
+Decision = collections.namedtuple('Decision', 'action key expected iterations children')
+
+class Advisor:
+    """GameState を受け取り、期待最終スコアが最大の行動を返す。
+
+    advance() で実際に選ばれた行動を伝えると、その部分木を次の探索に再利用する。
+    """
+    def __init__(self, time_limit=0.15, max_iterations=None, exploration=1.0,
+                 sample_schedule=True, seed=None, table_size=200_000, leaf_samples=8):
+        self.time_limit = time_limit
+        self.max_iterations = max_iterations
+        self.exploration = exploration
+        self.sample_schedule = sample_schedule
+        self.rng = random.Random(seed)
+        # 異なる手順で同じ局面に来た葉は、十分なサンプルが溜まっていればプレイアウトを省く
+        self.table_size = table_size
+        self.leaf_samples = leaf_samples
+        self.reset()
+
+    def reset(self):
+        self.root = Node()
+        self.table = TranspositionTable(self.table_size)
+        self.score_scale = 1.0
+        self._state = None
+
+    def advance(self, key):
+        """実際に行われた行動 key で根を進める (部分木の再利用)"""
+        self.root = self.root.children.get(key) or Node()
+
+    def _select(self, node, keys):
+        untried = [k for k in keys if k not in node.children]
+        if untried: return self.rng.choice(untried), True
+        log_n = math.log(max(1, sum(node.children[k].visits for k in keys)))
+        c = self.exploration
+        def ucb(k):
+            ch = node.children[k]
+            return ch.mean() / self.score_scale + c * math.sqrt(log_n / ch.visits)
+        return max(keys, key=ucb), False
+
+    def _iterate(self, sim):
+        determinize(sim, self.rng, self.sample_schedule)
+        node = self.root
+        path = [node]
+        while not sim.is_game_over():
+            keys = legal_keys(sim)
+            key, expand = self._select(node, keys)
+            sim.apply_action(keys[key])
+            if expand: node.children[key] = Node()
+            node = node.children[key]
+            path.append(node)
+            if expand: break
+        score = self._leaf_value(sim)
+        self.score_scale = max(self.score_scale, score)
+        for n in path:
+            n.visits += 1
+            n.total += score
+
+    def _leaf_value(self, sim):
+        if sim.is_game_over(): return sim.score
+        key = sim.state_key()
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= self.leaf_samples:
+            return sim.score + entry[1] / entry[0]
+        base = sim.score
+        score = rollout(sim, self.rng)
+        self.table.add(key, score - base)
+        return score
+
+    def search(self, state):
+        """予算 (time_limit 秒 / max_iterations 回) の範囲で探索し、反復回数を返す"""
+        if state is not self._state:
+            self.reset()
+            self._state = state
+        deadline = time.perf_counter() + self.time_limit if self.time_limit else None
+        # 作業用コピーを1つだけ作り、毎反復スナップショットから巻き戻して使う
+        sim = state.clone(rng=self.rng)
+        snap = sim.snapshot()
+        it = 0
+        while True:
+            if self.max_iterations is not None and it >= self.max_iterations: break
+            if deadline is not None and time.perf_counter() >= deadline: break
+            if self.max_iterations is None and deadline is None: break
+            if it: sim.restore(snap, restore_rng=False)
+            self._iterate(sim)
+            it += 1
+        return it
+
+    def decide(self, state):
+        """Decision(action, key, 期待最終スコア, 反復回数, 候補ごとの(訪問数, 平均)) を返す"""
+        iterations = self.search(state)
+        keys = legal_keys(state)
+        children = {k: (self.root.children[k].visits, self.root.children[k].mean())
+                    for k in keys if k in self.root.children}
+        if not children:
+            return Decision(('end',), ('end',), float(state.score), iterations, {})
+        # 最終的な選択は訪問回数最大 (ロバストな子) を採る
+        best = max(children, key=lambda k: children[k])
+        return Decision(keys[best], best, children[best][1], iterations, children)
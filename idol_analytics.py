@@ -0,0 +1,276 @@
+# シミュレーション結果の集計 (カードの得点寄与・ターン別ヒストグラム・ドリンクの使用タイミング)
+#   ゲームは1件ずつジェネレータで流し、Aggregator は合計・件数・ヒストグラムだけを持つので、
+#   ゲーム数によらずメモリは一定 (カード数 × ターン数程度)。
+#   入力: simulate_games() (GameState をイベント付きで回す) / replay_games() (リプレイファイルを再実行)
+#   出力: tables() の列指向の表 -> CSV (標準ライブラリ) / Parquet (pyarrow があれば)
+#   python idol_analytics.py -n 20000 --out analytics
+#   python idol_analytics.py --replays replays/games.idr --out analytics --parquet
+import argparse
+import collections
+import csv
+import io
+import os
+import random
+import time
+import zipfile
+
+from idol_engine import GameState, get_template_decks, MAX_TURNS
+from idol_engine.events import EV_SCORE, EV_DRINK, EV_PLAY
+
+HIST_BIN = 2000      # ターンごとの獲得スコアのヒストグラムの幅
+HIST_BINS = 30       # 最後のビンは HIST_BIN * (HIST_BINS-1) 以上をまとめる
+MAX_ACTIONS_PER_GAME = 1000
+
+# score: 最終スコア / genres: ターンごとの属性 / deck: デッキのカード名の集合 / events: [(turn, kind, args)]
+GameEvents = collections.namedtuple('GameEvents', 'score genres deck events')
+
+# ==========================================
+# 1. 入力 (1ゲームずつ返すジェネレータ)
+# ==========================================
+def _collect(state, step):
+    """step(state) を終局まで繰り返し、drain() したイベントをつなげた GameEvents を返す"""
+    events = []
+    state.start_turn()
+    for _ in range(MAX_ACTIONS_PER_GAME):
+        if state.is_game_over(): break
+        step(state)
+        # リングバッファが一周しないよう1手ごとに取り出す
+        events.extend(state.events.drain())
+    events.extend(state.events.drain())
+    return events
+
+def simulate_games(loadout, policy, n_games, seed=0):
+    """方針 policy で n_games 回プレイし、GameEvents を1件ずつ返す"""
+    char, deck, p_items, drinks = loadout
+    names = frozenset(c.name for c in deck)
+    rng = random.Random(seed)
+    def step(s):
+        if not s.apply_action(policy(s, rng)): s.apply_action(('end',))
+    for _ in range(n_games):
+        s = GameState(char, deck, p_items, drinks=drinks, verbose=True, rng=rng)
+        events = _collect(s, step)
+        yield GameEvents(s.score, tuple(t['genre'] for t in s.turn_info), names, events)
+
+def replay_games(path, limit=None):
+    """リプレイファイルのゲームを GameState で再実行し、GameEvents を1件ずつ返す。
+    終局前に行動列が尽きたり、適用できない手があれば ValueError (ReplayEngine.run と同じ)"""
+    from idol_replay import ReplayEngine, iter_replays, decode_action
+    engine = ReplayEngine(engine='object', verbose=True)
+    for n, replay in enumerate(iter_replays(path)):
+        if limit is not None and n >= limit: break
+        s = engine.state(replay)
+        names = frozenset(engine.catalog.card_names[i] for i in replay.deck)
+        actions = enumerate(replay.actions)
+        def step(s):
+            i, code = next(actions, (None, None))
+            if i is None: raise ValueError(f"replay {n}: actions ended at turn {s.turn} before the game was over")
+            action = decode_action(code)
+            if not s.apply_action(action): raise ValueError(f"replay {n}: illegal action {action} at step {i}")
+        events = _collect(s, step)
+        yield GameEvents(s.score, tuple(t['genre'] for t in s.turn_info), names, events)
+
+# ==========================================
+# 2. 集計
+# ==========================================
+class _CardStats:
+    __slots__ = ('games_in_deck', 'games_played', 'plays', 'direct_score', 'score_played', 'score_not_played',
+                 'turn_plays', 'genre_score')
+    def __init__(self):
+        self.games_in_deck = self.games_played = self.plays = self.direct_score = 0
+        self.score_played = self.score_not_played = 0
+        self.turn_plays = [0] * (MAX_TURNS + 1)
+        self.genre_score = collections.Counter()
+
+class Aggregator:
+    """GameEvents を add() するたびに集計値を更新する (ゲーム自体は保持しない)"""
+    def __init__(self, hist_bin=HIST_BIN, hist_bins=HIST_BINS):
+        self.hist_bin, self.hist_bins = hist_bin, hist_bins
+        self.games = 0
+        self.total_score = 0
+        self.cards = collections.defaultdict(_CardStats)
+        self.turn_score = [0] * (MAX_TURNS + 1)
+        self.turn_hist = [[0] * hist_bins for _ in range(MAX_TURNS + 1)]
+        self.genre_turn = collections.defaultdict(lambda: [0, 0])    # (turn, genre) -> [games, score]
+        self.drink_turns = collections.defaultdict(lambda: [0] * (MAX_TURNS + 1))
+
+    def add(self, game):
+        self.games += 1
+        self.total_score += game.score
+        per_turn = [0] * (MAX_TURNS + 2)
+        played = collections.Counter()
+        cards = self.cards
+        current = None   # 直前に使ったカード。次のカード・ドリンク・ターンが来るまでの得点をこのカードに付ける
+        last_turn = 0
+        for turn, kind, args in game.events:
+            if turn != last_turn: current, last_turn = None, turn
+            if kind == EV_SCORE:
+                gain = args[0]
+                per_turn[min(turn, MAX_TURNS + 1)] += gain
+                if current is not None:
+                    current.direct_score += gain
+                    if turn <= len(game.genres): current.genre_score[game.genres[turn-1]] += gain
+            elif kind == EV_PLAY:
+                current = cards[args[0]]
+                played[args[0]] += 1
+                if turn <= MAX_TURNS: current.turn_plays[turn] += 1
+            elif kind == EV_DRINK:
+                current = None
+                if turn <= MAX_TURNS: self.drink_turns[args[0]][turn] += 1
+
+        for name in game.deck | played.keys():
+            c = cards[name]
+            n = played.get(name, 0)
+            c.games_in_deck += 1
+            c.plays += n
+            if n: c.games_played += 1; c.score_played += game.score
+            else: c.score_not_played += game.score
+
+        last = self.hist_bins - 1
+        for turn in range(1, MAX_TURNS + 1):
+            gain = per_turn[turn]
+            self.turn_score[turn] += gain
+            self.turn_hist[turn][min(gain // self.hist_bin, last)] += 1
+            if turn <= len(game.genres):
+                g = self.genre_turn[(turn, game.genres[turn-1])]
+                g[0] += 1; g[1] += gain
+        return self
+
+    def consume(self, games, progress=None, every=500):
+        """ジェネレータを最後まで読む。progress(件数) を every 件ごとに呼ぶ"""
+        for i, game in enumerate(games, 1):
+            self.add(game)
+            if progress and i % every == 0: progress(i)
+        return self
+
+    # ---- 列指向の表 ({列名: [値]}) ----
+    def card_table(self):
+        rows = collections.defaultdict(list)
+        for name, c in sorted(self.cards.items(), key=lambda kv: -kv[1].direct_score):
+            not_played = c.games_in_deck - c.games_played
+            mean_played = c.score_played / c.games_played if c.games_played else None
+            mean_not = c.score_not_played / not_played if not_played else None
+            rows['card'].append(name)
+            rows['games_in_deck'].append(c.games_in_deck)
+            rows['play_rate'].append(c.games_played / c.games_in_deck if c.games_in_deck else 0.0)
+            rows['plays_per_game'].append(c.plays / c.games_in_deck if c.games_in_deck else 0.0)
+            rows['direct_score_per_play'].append(c.direct_score / c.plays if c.plays else 0.0)
+            rows['mean_score_played'].append(mean_played)
+            rows['mean_score_not_played'].append(mean_not)
+            # 使ったゲームと使わなかったゲームの平均スコアの差 (相関であって因果ではない)
+            rows['marginal_score'].append(mean_played - mean_not if mean_played is not None and mean_not is not None else None)
+        return dict(rows)
+
+    def card_turn_table(self):
+        rows = {'card': []}
+        for t in range(1, MAX_TURNS + 1): rows[f"t{t}"] = []
+        for name, c in sorted(self.cards.items()):
+            rows['card'].append(name)
+            for t in range(1, MAX_TURNS + 1): rows[f"t{t}"].append(c.turn_plays[t] / self.games if self.games else 0.0)
+        return rows
+
+    def card_genre_table(self):
+        genres = sorted({g for c in self.cards.values() for g in c.genre_score})
+        rows = {'card': [], **{g: [] for g in genres}}
+        for name, c in sorted(self.cards.items()):
+            rows['card'].append(name)
+            for g in genres: rows[g].append(c.genre_score[g] / self.games if self.games else 0.0)
+        return rows
+
+    def turn_table(self):
+        rows = collections.defaultdict(list)
+        genres = sorted({g for _, g in self.genre_turn})
+        for t in range(1, MAX_TURNS + 1):
+            rows['turn'].append(t)
+            rows['mean_score'].append(self.turn_score[t] / self.games if self.games else 0.0)
+            for g in genres:
+                n, total = self.genre_turn.get((t, g), (0, 0))
+                rows[f"{g}_share"].append(n / self.games if self.games else 0.0)
+                rows[f"{g}_mean_score"].append(total / n if n else None)
+        return dict(rows)
+
+    def histogram_table(self):
+        rows = {'bin_low': [i * self.hist_bin for i in range(self.hist_bins)]}
+        for t in range(1, MAX_TURNS + 1): rows[f"t{t}"] = list(self.turn_hist[t])
+        return rows
+
+    def drink_table(self):
+        rows = {'drink': []}
+        for t in range(1, MAX_TURNS + 1): rows[f"t{t}"] = []
+        for name, counts in sorted(self.drink_turns.items()):
+            rows['drink'].append(name)
+            for t in range(1, MAX_TURNS + 1): rows[f"t{t}"].append(counts[t] / self.games if self.games else 0.0)
+        return rows
+
+    def tables(self):
+        return {'cards': self.card_table(), 'card_turns': self.card_turn_table(), 'card_genres': self.card_genre_table(),
+                'turns': self.turn_table(), 'turn_histogram': self.histogram_table(), 'drinks': self.drink_table()}
+
+# ==========================================
+# 3. 出力
+# ==========================================
+def _write_rows(table, f):
+    cols = list(table)
+    w = csv.writer(f)
+    w.writerow(cols)
+    w.writerows(zip(*(table[c] for c in cols)))
+
+def write_csv(table, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f: _write_rows(table, f)
+
+def export_zip(tables):
+    """全表の CSV をまとめた zip (bytes)。UI のダウンロード用"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, table in tables.items():
+            text = io.StringIO(newline='')
+            _write_rows(table, text)
+            z.writestr(f"{name}.csv", text.getvalue())
+    return buf.getvalue()
+
+def write_parquet(table, path):
+    """pyarrow が必要 (未インストールなら ImportError)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pq.write_table(pa.table(table), path)
+
+def export(tables, out_dir, parquet=False):
+    """表ごとに <名前>.csv (parquet=True なら .parquet も) を書き、書いたパスを返す"""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        paths.append(os.path.join(out_dir, f"{name}.csv"))
+        write_csv(table, paths[-1])
+        if parquet:
+            paths.append(os.path.join(out_dir, f"{name}.parquet"))
+            write_parquet(table, paths[-1])
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="シミュレーション / リプレイを集計して CSV に書き出す")
+    parser.add_argument('-n', '--games', type=int, default=10000)
+    parser.add_argument('--deck', default="理想")
+    parser.add_argument('--char', default='shuki_kotone')
+    parser.add_argument('--items', nargs='*', default=[])
+    parser.add_argument('--drinks', nargs='*', default=[])
+    parser.add_argument('--policy', default='first')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replays', default=None, help="シミュレーションの代わりにこのリプレイファイルを集計する")
+    parser.add_argument('--out', default="analytics")
+    parser.add_argument('--parquet', action='store_true', help="Parquet も書き出す (pyarrow が必要)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.replays:
+        games = replay_games(args.replays, args.games)
+    else:
+        from idol_sim import POLICIES, build_loadout
+        loadout = build_loadout(get_template_decks()[args.deck], args.char, args.items, args.drinks[:3])
+        games = simulate_games(loadout, POLICIES[args.policy], args.games, args.seed)
+    agg = Aggregator().consume(games)
+    paths = export(agg.tables(), args.out, args.parquet)
+    print(f"{agg.games:,} games, mean score {agg.total_score / max(agg.games, 1):,.0f} ({time.perf_counter() - t0:.1f}s)")
+    for p in paths: print(f"  {p}")
+    return agg
+
+if __name__ == "__main__":
+    main()
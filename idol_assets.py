@@ -0,0 +1,119 @@
+# 画像アセットの事前読み込み (Pillow のみ使用。Streamlit には依存しない)
+#   起動時に Card / PItem / Drink / アイコンの画像パスを一度だけ解決し、縮小済みの PNG を
+#   メモリに保持する。再描画時にはファイルの存在確認もデコードも行わない。
+#   atlas() は複数の画像を1枚のシートに並べる (ゾーン表示を画像1要素にまとめるため)。
+import collections
+import io
+import os
+import threading
+
+from PIL import Image, ImageDraw
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIRS = ("", "image", "item")
+PLACEHOLDER = "placeholder.png"
+THUMBNAIL_SIZE = (180, 180)
+UI_ICONS = ("conc_icon.png", "good_icon.png", "super_good_icon.png")
+ATLAS_CELL = 96
+ATLAS_CACHE_SIZE = 128
+ATLAS_BACKGROUND = (255, 255, 255)
+
+class AssetRegistry:
+    def __init__(self, base_dir=BASE_DIR, size=THUMBNAIL_SIZE):
+        self.base_dir = base_dir
+        self.size = size
+        self.paths = {}
+        self.images = {}
+        self.decoded = {}
+        self.tiles = {}
+        # アトラスはセッション間で共有されるので、LRU の更新はロックで守る
+        self.atlases = collections.OrderedDict()
+        self.atlas_capacity = ATLAS_CACHE_SIZE
+        self.lock = threading.Lock()
+
+    def resolve(self, name):
+        """画像パスの安全な取得 (結果はキャッシュする)"""
+        if name in self.paths: return self.paths[name]
+        path = None
+        for d in ASSET_DIRS:
+            candidate = os.path.join(self.base_dir, d, name) if name else None
+            if candidate and os.path.exists(candidate):
+                path = candidate
+                break
+        if path is None and name != PLACEHOLDER:
+            path = self.resolve(PLACEHOLDER)
+        self.paths[name] = path
+        return path
+
+    def image(self, name):
+        """縮小済み PNG (bytes)。画像が無ければ None"""
+        if name in self.images: return self.images[name]
+        path = self.resolve(name)
+        data = None
+        if path:
+            with Image.open(path) as im:
+                im.thumbnail(self.size)
+                buf = io.BytesIO()
+                im.save(buf, format='PNG', optimize=True)
+                data = buf.getvalue()
+        self.images[name] = data
+        return data
+
+    def tile(self, name, cell):
+        """アトラスの1マス分 (cell x cell, 白背景の RGB)。画像が無ければ None"""
+        key = (name, cell)
+        if key in self.tiles: return self.tiles[key]
+        data = self.image(name)
+        tile = None
+        if data:
+            with Image.open(io.BytesIO(data)) as src:
+                im = src.convert('RGBA')
+            im.thumbnail((cell - 4, cell - 4))
+            tile = Image.new('RGB', (cell, cell), ATLAS_BACKGROUND)
+            tile.paste(im, ((cell - im.width) // 2, (cell - im.height) // 2), im)
+        self.tiles[key] = tile
+        return tile
+
+    def atlas(self, names, columns=3, cell=ATLAS_CELL, numbered=False):
+        """names の画像を columns 列のグリッドに並べた1枚の JPEG (bytes)。
+
+        マスは縮小済みのものを貼るだけなので合成は軽い。同じ並びは再合成しない。
+        numbered=True なら各マスの左上に 1 始まりの番号を入れる。
+        """
+        key = (tuple(names), columns, cell, numbered)
+        with self.lock:
+            data = self.atlases.get(key)
+            if data is not None:
+                self.atlases.move_to_end(key)
+                return data
+        rows = max(1, -(-len(key[0]) // columns))
+        sheet = Image.new('RGB', (columns * cell, rows * cell), ATLAS_BACKGROUND)
+        draw = ImageDraw.Draw(sheet)
+        for i, name in enumerate(key[0]):
+            x, y = (i % columns) * cell, (i // columns) * cell
+            tile = self.tile(name, cell)
+            if tile is not None: sheet.paste(tile, (x, y))
+            if numbered:
+                draw.rectangle((x + 2, y + 2, x + 22, y + 16), fill=(40, 40, 40))
+                draw.text((x + 5, y + 3), str(i + 1), fill=(255, 255, 255))
+        buf = io.BytesIO()
+        sheet.save(buf, format='JPEG', quality=85)
+        data = buf.getvalue()
+        with self.lock:
+            self.atlases[key] = data
+            if len(self.atlases) > self.atlas_capacity: self.atlases.popitem(last=False)
+        return data
+
+    def preload(self, names):
+        for name in names: self.image(name)
+        return self
+
+    def nbytes(self):
+        return sum(len(b) for b in self.images.values() if b) + sum(len(b) for b in self.atlases.values())
+
+def definition_images(*pools):
+    """定義の辞書 (カード・アイテム・ドリンク) から画像名を集める"""
+    names = list(UI_ICONS)
+    for pool in pools:
+        names.extend(obj.image_path for obj in pool.values())
+    return list(dict.fromkeys(names))
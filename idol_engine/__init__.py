@@ -0,0 +1,21 @@
+# ゲームエンジン (Streamlit / matplotlib に依存しない。シミュレータ等からも利用)
+#   標準ライブラリだけで import できるので、ワーカープロセスやスクリプトからの読み込みは数ミリ秒で済む。
+#   config   : 設定値
+#   ops      : 効果 (op レコード) と条件の解釈テーブル
+#   models   : Card / PItem / Drink / Character
+#   events   : 構造化イベントとリングバッファ
+#   state    : GameState とターンスケジュール
+#   fast     : シミュレーション用の配列ベース FastGameState (GameState と同じ結果)
+#   cards / items / drinks / characters : 定義データ
+#   rank     : 評価
+from .config import MAX_TURNS, MAX_HP, INITIAL_ENERGY, FIXED_UNIT
+from .ops import OPS, CONDITIONS
+from .models import Card, PItem, Drink, Character, CardSpec, compile_card
+from .events import EventBuffer, format_event, EVENT_NAMES
+from .state import GameState, enumerate_turn_schedules
+from .fast import FastGameState, CompiledLoadout, compile_loadout
+from .cards import get_full_card_pool
+from .items import get_all_p_items
+from .drinks import get_all_drinks
+from .characters import get_characters, get_template_decks
+from .rank import get_rank
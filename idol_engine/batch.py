@@ -0,0 +1,447 @@
+# NumPy によるバッチエンジン (同じロードアウト・同じ方針の K ゲームを配列で同時に進める)
+#   numpy が必要なので idol_engine からは自動で import しない (import idol_engine.batch)。
+#   全ゲームが同じターンを同時に進め、ターン内では「まだターンを終えていないゲーム」全体に
+#   1手ずつ方針を適用する。スコア計算・バフの減衰・ドロー・コスト支払いは配列演算で行い、
+#   カード効果は「そのカードを使ったゲームの添字配列」に対してまとめて適用する。
+#   乱数は numpy の Generator を使うので GameState とゲーム単位では一致しないが、
+#   ルールは同じなのでスコアの分布は一致する (benchmarks/batch_engine.py で確認)。
+#   対応範囲 (意図的に絞っている):
+#   - 方針は BATCH_POLICIES (first / random) だけ。先読みする方針 (idol_policies) は
+#     ゲームごとに snapshot / restore が要るので配列にできず、fast エンジンを使う。
+#   - 速度は1コアで 3〜5万ゲーム/秒 (FastGameState の 5〜7 倍) で、10万ゲーム/秒には届かない。
+#     残りは約5万ゲームの配列への1手ごとの gather / scatter で、メモリ帯域で頭打ちになっている
+#     (ドロー・手札の破棄・効果のカード別振り分けはまとめて配列で行っても変わらなかった)。
+import numpy as np
+
+from .config import MAX_TURNS, MAX_HP, INITIAL_ENERGY, FIXED_UNIT
+from .state import _schedule_template
+from .fast import (BUFF_KEYS, PERMANENT_KEYS, GOOD, SUPER, CONC_BOOST, PARAM, PARAM30,
+                   MENTAL_CONC, ACTIVE_CONC, ACTIVE_FIXED, TURN_END_CONC, MAX_HAND_SIZE)
+
+BATCH_POLICIES = ('first', 'random')
+MAX_STEPS_PER_TURN = 200
+_FLAG_ATTRS = ('double_next_mental_only', 'summer_memory_active')
+_COLS = np.arange(MAX_HAND_SIZE)
+
+# ==========================================
+# 1. op / 条件のコンパイル (f(batch, idx) の形にする)
+# ==========================================
+def _compile_op(op, lo):
+    name, args = op[0], op[1:]
+    if name == 'score':
+        base, conc_rate = (args + (1.0,))[:2]
+        return lambda b, idx: b.calculate_score(idx, base, conc_rate)
+    if name == 'draw':
+        return lambda b, idx: b.draw(idx, args[0])
+    if name in ('actions', 'energy', 'hp', 'double'):
+        attr = {'actions': 'actions', 'double': 'double_charges'}.get(name, name)
+        n = args[0]
+        def add(b, idx): getattr(b, attr)[idx] += n
+        return add
+    if name == 'conc':
+        return lambda b, idx: b.add_concentration(idx, args[0])
+    if name == 'buff':
+        k, turns = BUFF_KEYS.index(args[0]), args[1]
+        return lambda b, idx: b.add_buff(idx, k, turns)
+    if name == 'permanent':
+        if args[0] not in PERMANENT_KEYS: return lambda b, idx: None
+        k, val = PERMANENT_KEYS.index(args[0]), args[1]
+        def add_permanent(b, idx): b.permanent[idx, k] += val
+        return add_permanent
+    if name == 'set':
+        if args[0] not in _FLAG_ATTRS: raise ValueError(f"unsupported attribute: {args[0]}")
+        attr, value = args
+        def set_flag(b, idx): getattr(b, attr)[idx] = value
+        return set_flag
+    if name == 'reserve_draw':
+        turns_later, n = args
+        def reserve_draw(b, idx):
+            t = b.turn + turns_later
+            if t <= MAX_TURNS: b.draw_reservations[idx, t] += n
+        return reserve_draw
+    if name == 'reserve':
+        turns_later, ops = args[0], compile_batch_ops(args[1], lo)
+        def reserve(b, idx):
+            t = b.turn + turns_later
+            if t <= MAX_TURNS: b.reserved[t].append((ops, idx.copy()))
+        return reserve
+    if name == 'recurring':
+        turns, ops = args[0], compile_batch_ops(args[1], lo)
+        return lambda b, idx: b.recurring.append([turns, ops, idx.copy()])
+    if name == 'redraw_hand':
+        return lambda b, idx: b.redraw_hand(idx, args[0])
+    raise ValueError(f"unknown op: {name}")
+
+def compile_batch_ops(ops, lo):
+    fns = [_compile_op(op, lo) for op in ops]
+    if len(fns) == 1: return fns[0]
+    def run(b, idx):
+        for fn in fns: fn(b, idx)
+    return run
+
+def compile_batch_condition(cond, lo):
+    """条件 -> f(batch, idx) -> bool 配列"""
+    if cond is None: return lambda b, idx: np.ones(len(idx), bool)
+    name, args = cond[0], cond[1:]
+    if name == 'turn_at_least':
+        return lambda b, idx: np.full(len(idx), b.turn >= args[0])
+    if name == 'genre':
+        g = lo.genre_ids.get(args[0], -1)
+        return lambda b, idx: b.genres[idx, b.turn-1] == g
+    if name == 'buff_active':
+        k = BUFF_KEYS.index(args[0])
+        return lambda b, idx: b.buffs[idx, k] > 0
+    if name == 'last_card_type':
+        t = lo.type_id(args[0])
+        return lambda b, idx: b.last_card_type[idx] == t
+    if name == 'conc_at_least':
+        return lambda b, idx: b.concentration[idx] >= args[0]
+    if name == 'all':
+        conds = [compile_batch_condition(c, lo) for c in args]
+        def all_of(b, idx):
+            ok = conds[0](b, idx) if conds else np.ones(len(idx), bool)
+            for c in conds[1:]: ok &= c(b, idx)
+            return ok
+        return all_of
+    raise ValueError(f"unknown condition: {name}")
+
+def _groups(ids, g):
+    """[(ID, その ID を持つ g の要素)] を ID 順に返す (1回の並べ替えで全 ID に分ける)"""
+    order = np.argsort(ids, kind='stable')
+    ids, g = ids[order], g[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    return [(ids[a], g[a:b]) for a, b in zip(starts.tolist(), ends.tolist())]
+
+class BatchLoadout:
+    """(キャラ, デッキ, Pアイテム, ドリンク) をバッチ用の表に変換したもの"""
+    def __init__(self, character, deck, p_items, drinks=()):
+        self.types = [None]
+        cards = list({id(c): c for c in deck}.values())
+        index = {id(c): i for i, c in enumerate(cards)}
+        self.names = [c.name for c in cards]
+        self.deck = np.array([index[id(c)] for c in deck], dtype=np.int64)
+
+        template, pool = _schedule_template(character.genres)
+        tiers = list({id(t): t for t in template + pool if t is not None}.values())
+        tier_of = {id(t): i for i, t in enumerate(tiers)}
+        self.genre_ids = {g: i for i, g in enumerate(dict.fromkeys(t['genre'] for t in tiers))}
+        self.tier_weights = np.array([t['weight'] for t in tiers])
+        self.tier_genres = np.array([self.genre_ids[t['genre']] for t in tiers])
+        self.template = np.array([tier_of[id(t)] if t is not None else -1 for t in template])
+        self.free_slots = np.flatnonzero(self.template < 0)
+        self.pool = np.array([tier_of[id(t)] for t in pool])
+
+        # カードごとの仕様は配列で持ち、手札の ID 行列からまとめて引く
+        self.card_type = np.array([self.type_id(c.card_type) for c in cards])
+        self.conc_cost = np.array([c.cost_type == 'conc' for c in cards])
+        # 使用に必要な集中 / 体力 (そのコストでないカードは 0 なので常に満たす)
+        self.conc_need = np.array([c.cost_value if c.cost_type == 'conc' else 0 for c in cards], dtype=np.int64)
+        self.hp_need = np.array([c.cost_value if c.cost_type == 'hp' else 0 for c in cards], dtype=np.int64)
+        self.cost = np.array([c.cost_value for c in cards], dtype=np.int64)
+        self.scores_fixed = np.array([c.spec.scores_fixed for c in cards])
+        self.is_once = np.array([c.is_once for c in cards])
+        self.requirements = [(i, compile_batch_condition(c.requires, self)) for i, c in enumerate(cards) if c.requires]
+        self.effects = [compile_batch_ops(c.effects, self) for c in cards]
+        self.mental, self.active = self.type_id('mental'), self.type_id('active')
+        items = [(i, p.trigger_type, compile_batch_condition(p.condition, self), compile_batch_ops(p.effects, self), p.is_once)
+                 for i, p in enumerate(p_items)]
+        self.n_items = len(items)
+        self.start_items = [(i, c, e, once) for i, t, c, e, once in items if t == 'turn_start']
+        self.after_items = [(i, c, e, once) for i, t, c, e, once in items if t == 'after_action']
+        self.drink_names = [d.name for d in drinks]
+        self.drink_effects = [compile_batch_ops(d.effects, self) for d in drinks]
+        self.turn_events = {t: compile_batch_ops(ops, self) for t, ops in character.turn_events.items()}
+
+    def type_id(self, card_type):
+        if card_type not in self.types: self.types.append(card_type)
+        return self.types.index(card_type)
+
+def compile_batch_loadout(loadout):
+    return BatchLoadout(*loadout)
+
+# ==========================================
+# 2. バッチ状態
+# ==========================================
+class BatchGames:
+    """K ゲーム分の状態。run() で全ゲームを最後まで進めて最終スコアの配列を返す"""
+    def __init__(self, lo, n_games, rng, policy='first', turn_info=None):
+        if policy not in BATCH_POLICIES: raise ValueError(f"unsupported policy: {policy}")
+        K, D = n_games, len(lo.deck)
+        self.lo, self.n, self.rng, self.policy = lo, K, rng, policy
+        self.all = np.arange(K)
+        self.turn = 1
+        i64 = np.int64
+        self.hp = np.full(K, MAX_HP, i64)
+        self.energy = np.full(K, INITIAL_ENERGY, i64)
+        self.score = np.zeros(K, i64)
+        self.concentration = np.zeros(K, i64)
+        self.buffs = np.zeros((K, len(BUFF_KEYS)), i64)
+        self.protection = np.zeros((K, len(BUFF_KEYS)), bool)
+        self.permanent = np.zeros((K, len(PERMANENT_KEYS)), i64)
+        self.double_charges = np.zeros(K, i64)
+        self.double_next_mental_only = np.zeros(K, bool)
+        self.summer_memory_active = np.zeros(K, bool)
+        self.skill_use_count = np.zeros(K, i64)
+        self.last_card_type = np.zeros(K, i64)
+        self.actions = np.ones(K, i64)
+        self.draw_reservations = np.zeros((K, MAX_TURNS + 2), i64)
+        self.reserved = [[] for _ in range(MAX_TURNS + 2)]
+        self.recurring = []
+        self.item_used = np.zeros((K, lo.n_items), bool)
+
+        # ゾーンは (K, 枠) の行列 + 枚数。山札は末尾から引く
+        self.deck = lo.deck[np.argsort(rng.random((K, D)), axis=1)]
+        self.deck_len = np.full(K, D, i64)
+        self.hand = np.zeros((K, MAX_HAND_SIZE), i64)
+        self.hand_len = np.zeros(K, i64)
+        self.discard = np.zeros((K, D), i64)
+        self.discard_len = np.zeros(K, i64)
+        nd = len(lo.drink_effects)
+        self.drinks = np.tile(np.arange(nd), (K, 1))
+        self.drinks_len = np.full(K, nd, i64)
+
+        # ターンスケジュール: 可変枠に pool をゲームごとに並べ替えて入れる (turn_info 指定時は全ゲーム共通)
+        if turn_info is not None:
+            self.weights = np.tile([t['weight'] for t in turn_info], (K, 1))
+            self.genres = np.tile([lo.genre_ids.get(t['genre'], -1) for t in turn_info], (K, 1))
+        else:
+            tiers = np.tile(lo.template, (K, 1))
+            tiers[:, lo.free_slots] = lo.pool[np.argsort(rng.random((K, len(lo.pool))), axis=1)]
+            self.weights = lo.tier_weights[tiers]
+            self.genres = lo.tier_genres[tiers]
+        self.top_weight = self.weights.max(axis=1)
+
+    # ---- 基本操作 ----
+    def _conc_mult(self, idx):
+        return np.where(self.buffs[idx, CONC_BOOST] > 0, 1.5, 1.0)
+
+    def add_concentration(self, idx, amount):
+        self.concentration[idx] += np.ceil(amount * self._conc_mult(idx)).astype(np.int64)
+
+    def add_buff(self, idx, k, turns):
+        self.protection[idx, k] |= self.buffs[idx, k] == 0
+        self.buffs[idx, k] += turns
+
+    def calculate_score(self, idx, base, conc_rate=1.0, times=None):
+        # GameState.calculate_score と同じ式・同じ評価順 (float64 で計算するので丸めも一致する)
+        buffs = self.buffs[idx]
+        boost_mult = 1.0 + (buffs[:, PARAM] * 0.1)
+        boost_mult = np.where(buffs[:, PARAM30] > 0, boost_mult + 0.3, boost_mult)
+        power = np.ceil((base + self.concentration[idx] * conc_rate) * boost_mult)
+        good = buffs[:, GOOD]
+        mult = np.where(good > 0, np.where(buffs[:, SUPER] > 0, 1.5 + good * 0.1, 1.5), 1.0)
+        gain = np.ceil(power * mult * self.weights[idx, self.turn-1]).astype(np.int64)
+        if times is not None: gain *= times
+        self.score[idx] += gain
+
+    def _reshuffle(self, g):
+        # 捨て札を山札に戻してシャッフル (有効な枠だけを一様に並べ替える)
+        n, D = len(g), self.deck.shape[1]
+        keys = self.rng.random((n, D))
+        keys[np.arange(D) >= self.discard_len[g][:, None]] = 2.0
+        self.deck[g] = np.take_along_axis(self.discard[g], np.argsort(keys, axis=1), axis=1)
+        self.deck_len[g] = self.discard_len[g]
+        self.discard_len[g] = 0
+
+    def _take(self, g, n):
+        """ゲーム g の山札の末尾から n 枚ずつ手札に移す (1枚ずつ pop するのと同じ順番)"""
+        mask = _COLS < n[:, None]
+        rows = np.repeat(g, n)
+        src = (self.deck_len[g][:, None] - 1 - _COLS)[mask]
+        dst = (self.hand_len[g][:, None] + _COLS)[mask]
+        self.hand[rows, dst] = self.deck[rows, src]
+        self.deck_len[g] -= n
+        self.hand_len[g] += n
+
+    def draw(self, idx, num):
+        # 山札にある分をまとめて引き、足りないゲームだけ捨て札を戻して残りを引く
+        need = np.minimum(num, MAX_HAND_SIZE - self.hand_len[idx])
+        live = need > 0
+        g, need = idx[live], need[live]
+        if not len(g): return
+        got = np.minimum(need, self.deck_len[g])
+        self._take(g, got)
+        short = need > got
+        if short.any():
+            g, need = g[short], need[short] - got[short]
+            g, need = g[self.discard_len[g] > 0], need[self.discard_len[g] > 0]
+            if not len(g): return
+            self._reshuffle(g)
+            self._take(g, np.minimum(need, self.deck_len[g]))
+
+    def _push_discard(self, g, cards):
+        self.discard[g, self.discard_len[g]] = cards
+        self.discard_len[g] += 1
+
+    def _discard_hand(self, idx):
+        n = self.hand_len[idx]
+        mask = _COLS < n[:, None]
+        rows = np.repeat(idx, n)
+        self.discard[rows, (self.discard_len[idx][:, None] + _COLS)[mask]] = self.hand[idx][mask]
+        self.discard_len[idx] += n
+        self.hand_len[idx] = 0
+
+    def redraw_hand(self, idx, extra):
+        ct = self.hand_len[idx].copy()
+        self._discard_hand(idx)
+        self.draw(idx, ct + extra)
+
+    @staticmethod
+    def _remove_at(rows, pos):
+        """各行から pos 番目を取り除いて左に詰めた行列を返す"""
+        cols = np.arange(rows.shape[1])
+        src = np.minimum(cols + (cols >= pos[:, None]), rows.shape[1] - 1)
+        return np.take_along_axis(rows, src, axis=1)
+
+    def _check_items(self, items, idx):
+        for i, cond, effects, once in items:
+            cand = idx[~self.item_used[idx, i]] if once else idx
+            if not len(cand): continue
+            fire = cand[cond(self, cand)]
+            if len(fire):
+                effects(self, fire)
+                if once: self.item_used[fire, i] = True
+
+    # ---- ターン進行 ----
+    def start_turn(self):
+        lo, idx = self.lo, self.all
+        ev = lo.turn_events.get(self.turn)
+        if ev: ev(self, idx)
+        self.actions[:] = 1
+        if lo.start_items: self._check_items(lo.start_items, idx)
+        self.protection = self.buffs == 0
+        draw_num = 3 + self.draw_reservations[:, self.turn] - self.hand_len
+        g = idx[draw_num > 0]
+        if len(g): self.draw(g, draw_num[g])
+        active = []
+        for eff in self.recurring:
+            eff[1](self, eff[2])
+            eff[0] -= 1
+            if eff[0] > 0: active.append(eff)
+        self.recurring = active
+
+    def end_turn(self):
+        pc = self.permanent[:, TURN_END_CONC]
+        if (pc > 0).any():
+            self.concentration += np.where(pc > 0, np.ceil(pc * self._conc_mult(self.all)), 0).astype(np.int64)
+        self.buffs -= (self.buffs > 0) & ~self.protection
+        self._discard_hand(self.all)
+        self.turn += 1
+        if self.turn <= MAX_TURNS + 1:
+            for ops, idx in self.reserved[self.turn]: ops(self, idx)
+
+    def _playable(self, g):
+        """(len(g), MAX_HAND_SIZE) の使用可能フラグ"""
+        lo = self.lo
+        hand = self.hand[g]
+        ok = (self.concentration[g][:, None] >= lo.conc_need[hand]) & (self.hp[g][:, None] >= lo.hp_need[hand])
+        for c, req in lo.requirements:
+            in_hand = hand == c
+            if in_hand.any(): ok &= ~in_hand | req(self, g)[:, None]
+        ok &= np.arange(MAX_HAND_SIZE) < self.hand_len[g][:, None]
+        ok &= (self.actions[g] > 0)[:, None]
+        return ok
+
+    def step(self, g):
+        """ターン中のゲーム g に1手ずつ進め、まだターンを続けるゲームを返す"""
+        playable = self._playable(g)
+        n_drinks = self.drinks_len[g]
+        if self.policy == 'first':
+            any_play = playable.any(axis=1)
+            use_drink = (n_drinks > 0) & ((self.weights[g, self.turn-1] == self.top_weight[g]) | ~any_play)
+            play = ~use_drink & any_play
+            end = ~use_drink & ~any_play
+            pos = playable.argmax(axis=1)
+            dpos = np.zeros(len(g), np.int64)
+        else:
+            n_play = playable.sum(axis=1)
+            r = (self.rng.random(len(g)) * (n_play + n_drinks + 1)).astype(np.int64)
+            play = r < n_play
+            end = r == n_play + n_drinks
+            use_drink = ~play & ~end
+            pos = (np.cumsum(playable, axis=1) == (r + 1)[:, None]).argmax(axis=1)
+            dpos = r - n_play
+
+        d = np.flatnonzero(use_drink)
+        if len(d):
+            gd = g[d]
+            ids = self.drinks[gd, dpos[d]]
+            self.drinks[gd] = self._remove_at(self.drinks[gd], dpos[d])
+            self.drinks_len[gd] -= 1
+            for k, sub in _groups(ids, gd): self.lo.drink_effects[k](self, sub)
+
+        p = np.flatnonzero(play)
+        if len(p):
+            gp = g[p]
+            cids = self.hand[gp, pos[p]]
+            self.hand[gp] = self._remove_at(self.hand[gp], pos[p])
+            self.hand_len[gp] -= 1
+            self._resolve_cards(gp, cids)
+        return g[~end]
+
+    def _resolve_cards(self, gp, cids):
+        """ゲーム gp がそれぞれカード cids を使う。カード固有の効果以外は全ゲームまとめて処理する"""
+        lo = self.lo
+        types = lo.card_type[cids]
+        self.last_card_type[gp] = types
+        cost, conc_cost = lo.cost[cids], lo.conc_cost[cids]
+        self.concentration[gp] -= np.where(conc_cost, cost, 0)
+        energy, hp = self.energy[gp], self.hp[gp]
+        pay = energy >= cost
+        self.energy[gp] = np.where(conc_cost, energy, np.where(pay, energy - cost, 0))
+        self.hp[gp] = np.where(conc_cost | pay, hp, np.maximum(0, hp - (cost - energy)))
+
+        mental, active = types == lo.mental, types == lo.active
+        pc = np.where(mental, self.permanent[gp, MENTAL_CONC], np.where(active, self.permanent[gp, ACTIVE_CONC], 0))
+        if (pc > 0).any():
+            self.concentration[gp] += np.where(pc > 0, np.ceil(pc * self._conc_mult(gp)), 0).astype(np.int64)
+
+        twice = self.double_charges[gp] > 0
+        self.double_charges[gp] -= twice
+        encore = ~twice & mental & self.double_next_mental_only[gp]
+        self.double_next_mental_only[gp[encore]] = False
+        twice |= encore
+
+        fixed = lo.scores_fixed[cids]
+        for sub, sub_cids, sub_fixed in ((gp, cids, fixed), (gp[twice], cids[twice], fixed[twice])):
+            if not len(sub): continue
+            if sub_fixed.any():
+                # 固定P は calculate_score(3) を stack 数だけ足すのと同じ (同じ局面なので毎回同値)
+                count = np.where(sub_fixed, self.permanent[sub, ACTIVE_FIXED] // FIXED_UNIT, 0)
+                has = count > 0
+                if has.any(): self.calculate_score(sub[has], FIXED_UNIT, 1.0, count[has])
+            for c, games in _groups(sub_cids, sub): lo.effects[c](self, games)
+
+        keep = ~lo.is_once[cids]
+        self._push_discard(gp[keep], cids[keep])
+
+        summer = self.summer_memory_active[gp]
+        if summer.any():
+            self.skill_use_count[gp] += summer
+            fire = gp[summer & (self.skill_use_count[gp] % 5 == 0)]
+            if len(fire): self.calculate_score(fire, 4)
+
+        if lo.after_items: self._check_items(lo.after_items, gp)
+        self.actions[gp] -= 1
+
+    def run(self):
+        self.start_turn()
+        while self.turn <= MAX_TURNS:
+            g = self.all
+            for _ in range(MAX_STEPS_PER_TURN):
+                if not len(g): break
+                g = self.step(g)
+            self.end_turn()
+            if self.turn <= MAX_TURNS: self.start_turn()
+        return self.score
+
+def run_batch(lo, n_games, rng, policy='first', batch_size=50_000, turn_info=None):
+    """n_games を batch_size ずつ BatchGames で実行し、最終スコアの配列を返す"""
+    scores = []
+    done = 0
+    while done < n_games:
+        k = min(batch_size, n_games - done)
+        scores.append(BatchGames(lo, k, rng, policy, turn_info).run())
+        done += k
+    return np.concatenate(scores) if scores else np.zeros(0, np.int64)
@@ -0,0 +1,51 @@
+# カードプール
+from .models import Card
+
+def get_full_card_pool():
+    pool = []
+    
+    # SSR
+    eff_famous_idol = (('double', 1), ('actions', 1), ('buff', 'good_condition', -1))
+    pool.append(Card("国民的アイドル", 'hp', 0, 'mental', eff_famous_idol, is_once=True, rarity='SSR',description="[1回] 次の効果を2回発動(重複可)/行動+1", image_path="famous_idle.png"))
+    eff_call_response = (('score', 15, 1.0), ('score', 34, 1.5))
+    pool.append(Card("コール＆レスポンス+", 'hp', 3, 'active', eff_call_response, is_once=True, rarity='SSR',description="P+15/P+34(集中1.5倍)", image_path="card_cr.png"))
+    eff_shikiri = (('redraw_hand', 2), ('actions', 1))
+    pool.append(Card("仕切り直し", 'hp', 2, 'mental', eff_shikiri, is_once=True, rarity='SSR',description="[1回] 手札入替+2枚/行動+1", image_path="card_shikiri.png"))
+    eff_turn_end_boost = (('permanent', 'turn_end_conc', 2),)
+    pool.append(Card("天真爛漫", 'hp', 4, 'mental', eff_turn_end_boost, is_once=True, rarity='SR',description="永続:ターン終了時集中+2", image_path="card_ranman.png"))
+    cond_hitotoki = ('turn_at_least', 3)
+    eff_hitotoki = (('buff', 'good_condition', -1), ('buff', 'conc_boost', 3), ('conc', 4))
+    pool.append(Card("ほぐれるひととき", 'hp', 0, 'mental', eff_hitotoki, requires=cond_hitotoki, is_once=True, rarity='SSR',description="[3T以降]集中+50%/集中+4", image_path="card_hogure.png"))
+    eff_shisen = (('buff', 'super_good', 5), ('actions', 1))
+    pool.append(Card("魅惑の視線", 'conc', 3, 'mental', eff_shisen, is_once=True, rarity='SSR',description="絶好調+5/行動+1", image_path="card_shisen.png"))
+    eff_entertainment = (('reserve_draw', 1, 1), ('permanent', 'active_score_fixed', 3))
+    pool.append(Card("至高のエンタメ", 'conc', 2, "active", eff_entertainment, is_once=True, rarity='SSR',description="永続:アクティブP+3/次T1枚", image_path="card_entame.png"))
+    eff_paformance = (('buff', 'super_good', 4), ('reserve', 1, (('score', 47, 1.0),)), ('reserve', 2, (('score', 21, 1.0),)))
+    pool.append(Card("魅惑のパフォーマンス", 'hp', 6, 'active', eff_paformance, is_once=True,rarity='SSR', description="絶好調+4/1T後P+47/2T後P+21", image_path="card_pafo.png"))
+    eff_summer_memory = (('actions', 1), ('set', 'summer_memory_active', True))
+    pool.append(Card("夏夜に咲く思い出", 'hp', 6, 'active', eff_summer_memory, is_once=True, rarity='SSR',description="行動+1/5回毎にP+4", image_path="card_natsuyo.png"))
+    eff_tenpu = (('buff', 'good_condition', 6), ('conc', 3), ('reserve', 1, (('actions', 1),)))
+    pool.append(Card("天賦の才", 'hp', 5, 'mental', eff_tenpu, is_once=True, rarity='SSR', description="好調+6/集中+3/次行動+1", image_path="card_tenpu.png"))
+    eff_syuki = (('permanent', 'mental_conc', 2), ('conc', 1))
+    pool.append(Card("自己肯定感爆上げ中", 'hp', -1, 'mental', eff_syuki, is_once=True, rarity='SSR',description="永続:メンタル集中+2", image_path="card_syuki.png"))
+
+    # SR
+    eff_prey_power = (('permanent', 'active_conc', 1), ('conc', 2))
+    pool.append(Card("願いの力", 'hp', 3, 'mental', eff_prey_power, is_once=True, rarity='SR',description="永続:アクティブ使用時集中+1/集中+2", image_path="card_negai.png"))
+    eff_spot_light = (('reserve_draw', 1, 2), ('reserve_draw', 2, 1), ('buff', 'good_condition', 9))
+    pool.append(Card("スポットライト", 'hp', 0, 'mental', eff_spot_light, rarity='SR',description="1T後2枚+2T後1枚/好調+9", image_path="card_spot.png"))
+    eff_shupure = (('score', 6, 1.0), ('buff', 'good_condition', 3), ('actions', 1))
+    pool.append(Card("シュプレヒコール", 'conc', 1, 'active', eff_shupure, rarity='SR',description="[集中1] P+6/好調3T/行動+1", image_path="card_syupu.png"))
+    eff_exist = (('conc', 5), ('actions', 1))
+    pool.append(Card("存在感", 'hp', 0, 'mental', eff_exist, rarity='SR',description="集中+5/行動+1", image_path="card_sonzai.png"))
+    eff_im_idol = (('draw', 2), ('actions', 1))
+    pool.append(Card("アイドル宣言", 'hp', 0, 'mental', eff_im_idol,is_once=True,rarity='SR',description="２枚引く", image_path="card_dolsen.png"))
+    eff_aizu = (('buff', 'good_condition', 7),)
+    pool.append(Card("始まりの合図+", 'hp', 3, 'mental', eff_aizu, is_once=True, rarity='SR',description="[1回] 好調+7", image_path="card_aizu.png")) 
+
+    # R
+    eff_hitokyu = (('buff', 'good_condition', 4), ('conc', 5))
+    pool.append(Card("ひと呼吸+", 'hp', 7, 'mental', eff_hitokyu, is_once=True, rarity='R',description="[1回] 好調+4/集中+5", image_path="card_hitokyu.png")) 
+
+    card_dict = {card.name: card for card in pool}
+    return card_dict
@@ -0,0 +1,34 @@
+# キャラクターとテンプレデッキ
+from .cards import get_full_card_pool
+from .items import get_all_p_items
+from .models import Character
+
+# ★キャラクター定義
+def get_characters():
+    card_pool = get_full_card_pool()
+    item_pool = get_all_p_items()
+    
+    turn_evs = { 5: (('conc', 8),), 9: (('conc', 13),) }
+    
+    chars = {}
+    chars['shuki_kotone'] = Character(
+        "しゅきことね", 
+        ['dance', 'visual', 'vocal'], 
+        card_pool.get("自己肯定感爆上げ中"), 
+        item_pool.get("しゅきハート+"),
+        turn_events=turn_evs
+    )
+    # 必要に応じて他キャラ追加
+    return chars
+
+# ★テンプレデッキ
+def get_template_decks():
+    # とりあえずシンプルな構成
+    return {
+        "理想": {
+            "国民的アイドル": 1, "コール＆レスポンス+": 1, "仕切り直し": 1, "魅惑の視線": 1,
+            "至高のエンタメ": 1, "魅惑のパフォーマンス": 1, "夏夜に咲く思い出": 1, "天賦の才": 1,
+            "シュプレヒコール": 1, "ひと呼吸+": 1,"ほぐれるひととき":1,"願いの力":1,"アイドル宣言":1,
+            "存在感":1,"スポットライト":1,"天真爛漫":1,"始まりの合図+":1,"夏夜に咲く思い出":1
+        }
+    }
@@ -0,0 +1,5 @@
+# 設定値
+MAX_TURNS = 12
+MAX_HP = 100
+INITIAL_ENERGY = 0
+FIXED_UNIT = 3   # アクティブ固定P (active_score_fixed) は3単位で積まれ、1単位ごとに calculate_score(3) で得点化する
@@ -0,0 +1,14 @@
+# ドリンク
+from .models import Drink
+
+def get_all_drinks():
+    drinks = []
+    eff_senburi = (('buff', 'param_boost', 5), ('draw', 2), ('recurring', 5, (('draw', 1),), "ドロー継続"))
+    drinks.append(Drink("センブリソーダ", "P上昇+10%/2枚引く/5T継続ドロー", eff_senburi, image_path="drink_senburi.png"))
+    
+    # ★修正: ブーストエキスは「固定30%上昇」の効果に変更 (値は減らない、ターンのみ減る)
+    # 実装: buffs['param_boost_30'] に継続ターンを設定
+    eff_boost = (('hp', -2), ('buff', 'param_boost_30', 3)) # 3ターン継続
+    drinks.append(Drink("ブーストエキス", "HP-2/P上昇30%(3T)", eff_boost, image_path="drink_boost.png"))
+    
+    return {d.name: d for d in drinks}
@@ -0,0 +1,56 @@
+# 構造化イベント
+#   GameState は文字列ではなく (ターン, 種類, 引数) のタプルを固定長のリングバッファに記録する。
+#   表示用の文字列は UI が読み出すときだけ format_event() で組み立てる。
+EV_SCORE, EV_DOUBLE, EV_ENCORE, EV_ITEM, EV_DRINK, EV_BUFF, EV_DRAW, EV_PLAY = range(8)
+EVENT_NAMES = ('score', 'double', 'encore', 'item', 'drink', 'buff', 'draw', 'play')
+
+# ログに表示する種類だけ書式を持つ (バフ・ドロー・カード使用は表示しない)
+_FORMATS = {
+    EV_SCORE:  "🎤 Score +{0}",
+    EV_DOUBLE: "🔄 '{0}'の効果が2回発動！",
+    EV_ENCORE: "🔄 メンタル再演！'{0}'が2回発動！",
+    EV_ITEM:   "⭐ Pアイテム'{0}'が発動！",
+    EV_DRINK:  "🥤 {0}を使用",
+}
+
+def format_event(event):
+    """表示用の文字列。表示しない種類なら None"""
+    turn, kind, args = event
+    fmt = _FORMATS.get(kind)
+    return fmt.format(*args) if fmt else None
+
+class EventBuffer:
+    """容量固定のリングバッファ。位置は通し番号 (count) で指定する。
+
+    容量を超えると古いものから上書きされ、since() は残っている分だけを返す。
+    """
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.count = 0
+        self.low = 0    # 上書きされずに残っている最古の通し番号
+        self.read = 0   # drain() で読み出し済みの位置
+
+    def append(self, turn, kind, args):
+        self.slots[self.count % self.capacity] = (turn, kind, args)
+        self.count += 1
+        if self.count - self.low > self.capacity: self.low = self.count - self.capacity
+
+    def since(self, mark):
+        cap = self.capacity
+        return [self.slots[i % cap] for i in range(max(mark, self.low), self.count)]
+
+    def drain(self):
+        """前回の drain() 以降のイベントを返し、読み出し済みにする"""
+        events = self.since(self.read)
+        self.read = self.count
+        return events
+
+    def truncate(self, count):
+        """通し番号 count 以降を捨てる (undo 用)"""
+        self.count = count
+        self.low = min(self.low, count)
+        self.read = min(self.read, count)
+
+    def __len__(self):
+        return self.count - self.low
@@ -0,0 +1,471 @@
+# シミュレーション専用の軽量 GameState
+#   ルールは GameState と同じだが、状態は __slots__ のスカラーと固定長リストだけで持つ。
+#   カードはロードアウトごとに振った小さな整数 ID で扱い、コスト・種類・効果は ID で引く表にまとめる。
+#   op レコードと条件は compile_loadout() の時点でクロージャに変換しておく。イベントは記録しない。
+#   乱数の消費順は GameState と同じなので、同じ rng・同じ方針なら最終スコアも一致する。
+#   1手先読みする方針 (idol_policies) は snapshot / restore ではなく branch() の複製で先読みする。
+#   GameState 比の実測 (benchmarks/fast_state.py、理想 デッキ・ドリンク2つ、1ゲームあたり):
+#   first 1.9〜2.2倍 / random 1.2〜1.6倍 / greedy・conc・rules・timing 2.6〜3.3倍。
+import math
+import random
+from operator import attrgetter
+
+from .config import MAX_TURNS, MAX_HP, INITIAL_ENERGY, FIXED_UNIT
+from .state import _schedule_template
+
+BUFF_KEYS = ('good_condition', 'super_good', 'conc_boost', 'param_boost', 'param_boost_30')
+PERMANENT_KEYS = ('mental_conc', 'active_conc', 'active_score_fixed', 'turn_end_conc')
+GOOD, SUPER, CONC_BOOST, PARAM, PARAM30 = range(5)
+MENTAL_CONC, ACTIVE_CONC, ACTIVE_FIXED, TURN_END_CONC = range(4)
+MAX_HAND_SIZE = 5
+
+# ==========================================
+# 1. op レコードのコンパイル
+# ==========================================
+# op レコードは FAST_OPS の工場関数で引数を閉じ込めたクロージャ f(s) にし、
+# 列はそれを順に呼ぶ1つの関数にまとめる (同じ列は一度だけ作って使い回す)。
+# 実行時には OPS の辞書引きや op[1:] のスライスは発生しない。
+_COMPILED = {}
+
+def _redraw_hand(s, extra):
+    ct = len(s.hand); s.discard.extend(s.hand); s.hand = []; s.draw_cards(ct + extra)
+
+def _reserve(s, turns_later, fn):
+    t = s.turn + turns_later
+    if t <= s.max_turns:
+        # 予約の列はその場で書き換えずに作り直す (branch() は外側のリストだけを複製する)
+        r = s.reserved[t]
+        s.reserved[t] = [fn] if r is None else r + [fn]
+
+def _add(attr, n):
+    get = attrgetter(attr)
+    return lambda s: setattr(s, attr, get(s) + n)
+
+def _set(attr, value):
+    if attr not in FastGameState.__slots__: raise ValueError(f"unknown attribute: {attr}")
+    return lambda s: setattr(s, attr, value)
+
+def _conc(n):
+    boosted = math.ceil(n * 1.5); plain = math.ceil(n * 1.0)
+    def fx(s): s.concentration += boosted if s.buffs[CONC_BOOST] > 0 else plain
+    return fx
+
+def _buff(key, turns):
+    k = BUFF_KEYS.index(key)
+    def fx(s):
+        if s.buffs[k] == 0: s.protection[k] = True
+        s.buffs[k] += turns
+    return fx
+
+def _permanent(key, val):
+    if key not in PERMANENT_KEYS: return _noop
+    k = PERMANENT_KEYS.index(key)
+    def fx(s): s.permanent[k] += val
+    return fx
+
+def _reserve_draw(turns_later, n):
+    def fx(s):
+        t = s.turn + turns_later
+        if t <= s.max_turns: s.draw_reservations[t] += n
+    return fx
+
+def _recurring(turns, ops, desc=None):
+    fn = compile_ops(ops)
+    return lambda s: s.recurring.append((turns, fn))
+
+def _noop(s): pass
+
+# op名 -> 引数を受け取ってクロージャ f(s) を返す工場関数 (OPS と同じ名前・同じ引数)
+FAST_OPS = {
+    'score':        lambda base, conc_rate=1.0: lambda s: s.calculate_score(base, conc_rate),
+    'draw':         lambda n: lambda s: s.draw_cards(n),
+    'actions':      lambda n: _add('actions_remaining', n),
+    'conc':         _conc,
+    'buff':         _buff,
+    'permanent':    _permanent,
+    'energy':       lambda n: _add('energy', n),
+    'hp':           lambda n: _add('hp', n),
+    'double':       lambda n: _add('double_charges', n),
+    'set':          _set,
+    'reserve_draw': _reserve_draw,
+    'reserve':      lambda turns_later, ops: (lambda fn: lambda s: _reserve(s, turns_later, fn))(compile_ops(ops)),
+    'recurring':    _recurring,
+    'redraw_hand':  lambda extra: lambda s: _redraw_hand(s, extra),
+}
+
+def _sequence(fns):
+    if not fns: return _noop
+    if len(fns) == 1: return fns[0]
+    if len(fns) == 2:
+        a, b = fns
+        def fx2(s): a(s); b(s)
+        return fx2
+    def fx(s):
+        for fn in fns: fn(s)
+    return fx
+
+def compile_ops(ops):
+    """op レコードの列 -> 関数 f(state)"""
+    fn = _COMPILED.get(ops)
+    if fn is None:
+        fns = []
+        for op in ops:
+            factory = FAST_OPS.get(op[0])
+            if factory is None: raise ValueError(f"unknown op: {op[0]}")
+            fns.append(factory(*op[1:]))
+        fn = _COMPILED[ops] = _sequence(tuple(fns))
+    return fn
+
+def _all(*conds):
+    fns = tuple(_compile_condition(c) for c in conds)
+    if len(fns) == 1: return fns[0]
+    return lambda s: all(fn(s) for fn in fns)
+
+# 条件名 -> 引数を受け取って f(s) -> bool を返す工場関数 (CONDITIONS と同じ名前・同じ引数)
+FAST_CONDITIONS = {
+    'turn_at_least':  lambda n: lambda s: s.turn >= n,
+    'genre':          lambda genre: lambda s: s.genres[s.turn-1] == genre,
+    'buff_active':    lambda key: (lambda k: lambda s: s.buffs[k] > 0)(BUFF_KEYS.index(key)),
+    'last_card_type': lambda card_type: lambda s: s.last_card_type == card_type,
+    'conc_at_least':  lambda n: lambda s: s.concentration >= n,
+    'all':            _all,
+}
+
+def _compile_condition(cond):
+    factory = FAST_CONDITIONS.get(cond[0])
+    if factory is None: raise ValueError(f"unknown condition: {cond[0]}")
+    return factory(*cond[1:])
+
+def compile_condition(cond, cost=None):
+    """条件 (と支払うコスト (属性名, 値)) -> 関数 f(state) -> bool"""
+    check = _compile_condition(cond) if cond else None
+    if cost is None: return check or (lambda s: True)
+    get, value = attrgetter(cost[0]), cost[1]
+    if check is None: return lambda s: get(s) >= value
+    return lambda s: get(s) >= value and check(s)
+
+# ==========================================
+# 2. ロードアウトの表
+# ==========================================
+class CompiledLoadout:
+    """(キャラ, デッキ, Pアイテム, ドリンク) を ID と表に変換したもの。ゲーム間で共有する"""
+    def __init__(self, character, deck, p_items, drinks=()):
+        self.cards = list({id(c): c for c in deck}.values())
+        index = {id(c): i for i, c in enumerate(self.cards)}
+        self.deck = [index[id(c)] for c in deck]
+        self.names = [c.name for c in self.cards]
+        self.conc_cost = [c.cost_type == 'conc' for c in self.cards]
+        self.cost = [c.cost_value for c in self.cards]
+        self.card_type = [c.card_type for c in self.cards]
+        self.is_once = [c.is_once for c in self.cards]
+        self.effects = [compile_ops(c.effects) for c in self.cards]
+        # コストの支払い可否と使用条件をまとめた関数
+        cost_attr = {'conc': 'concentration', 'hp': 'hp'}
+        self.can_use = [compile_condition(c.requires, (cost_attr[c.cost_type], c.cost_value) if c.cost_type in cost_attr else None)
+                        for c in self.cards]
+        self.scores_fixed = [c.spec.scores_fixed for c in self.cards]
+        # _resolve_card が1回の添字で引けるようにまとめたもの
+        self.specs = list(zip(self.card_type, self.conc_cost, self.cost, self.effects, self.scores_fixed, self.is_once))
+
+        # Pアイテムはトリガーごとに分けて (番号, 条件, 効果, 1回限り) で持つ
+        items = [(i, p.trigger_type, compile_condition(p.condition), compile_ops(p.effects), p.is_once)
+                 for i, p in enumerate(p_items)]
+        self.n_items = len(items)
+        self.start_items = [(i, c, e, once) for i, t, c, e, once in items if t == 'turn_start']
+        self.after_items = [(i, c, e, once) for i, t, c, e, once in items if t == 'after_action']
+        self.drink_names = [d.name for d in drinks]
+        self.drink_effects = [compile_ops(d.effects) for d in drinks]
+        self.turn_events = [None] * (MAX_TURNS + 2)
+        for t, ops in character.turn_events.items():
+            if t < len(self.turn_events): self.turn_events[t] = compile_ops(ops)
+        self.template, self.pool = _schedule_template(character.genres)
+
+def compile_loadout(loadout):
+    return CompiledLoadout(*loadout)
+
+# ==========================================
+# 3. 状態
+# ==========================================
+_CARD_ACTIONS = tuple(('card', i) for i in range(MAX_HAND_SIZE))
+_END = ('end',)
+
+_new_state = object.__new__
+
+class _BranchRng:
+    # branch() の乱数。使われるまでは元の乱数を写さない (先読みの手はほとんどシャッフルしない)
+    __slots__ = ('parent', 'rng')
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.rng = None
+
+    def getstate(self):
+        return (self.parent if self.rng is None else self.rng).getstate()
+
+    def setstate(self, state):
+        # Random() は os.urandom で初期化するので、__new__ で作って状態だけ入れる
+        self.rng = random.Random.__new__(random.Random)
+        self.rng.setstate(state)
+
+    def shuffle(self, x):
+        if self.rng is None: self.setstate(self.parent.getstate())
+        self.rng.shuffle(x)
+
+class FastGameState:
+    __slots__ = (
+        'rng', 'lo', 'turn', 'max_turns', 'hp', 'energy', 'score', 'concentration',
+        'buffs', 'protection', 'permanent',
+        'double_charges', 'double_next_mental_only', 'summer_memory_active', 'skill_use_count',
+        'last_card_type', 'actions_remaining', 'next_turn_draw_bonus',
+        'draw_reservations', 'reserved', 'recurring',
+        'deck', 'hand', 'discard', 'exile', 'item_used', 'drinks',
+        'turn_info', 'genres', 'weights', 'top_weight',
+    )
+
+    def __init__(self, lo, rng, turn_info=None):
+        self.rng = rng
+        self.lo = lo
+        self.turn = 1
+        self.max_turns = MAX_TURNS
+        self.hp = MAX_HP
+        self.energy = INITIAL_ENERGY
+        self.score = 0
+        self.concentration = 0
+        self.buffs = [0, 0, 0, 0, 0]
+        self.protection = [False] * 5
+        self.permanent = [0, 0, 0, 0]
+        self.double_charges = 0
+        self.double_next_mental_only = False
+        self.summer_memory_active = False
+        self.skill_use_count = 0
+        self.last_card_type = None
+        self.actions_remaining = 1
+        self.next_turn_draw_bonus = 0
+        self.draw_reservations = [0] * (MAX_TURNS + 2)
+        self.reserved = [None] * (MAX_TURNS + 2)
+        self.recurring = []
+
+        self.deck = list(lo.deck)
+        rng.shuffle(self.deck)
+        self.hand = []
+        self.discard = []
+        self.exile = []
+        self.item_used = [False] * lo.n_items
+        self.drinks = list(range(len(lo.drink_effects)))
+        if turn_info is None:
+            # GameState._generate_turn_schedule と同じ手順 (枠の辞書はロードアウト内で共有する)
+            turn_info = list(lo.template); pool = list(lo.pool)
+            rng.shuffle(pool)
+            for i in range(12):
+                if turn_info[i] is None: turn_info[i] = pool.pop()
+        self.turn_info = turn_info
+        self.genres = [t['genre'] for t in turn_info]
+        self.weights = [t['weight'] for t in turn_info]
+        self.top_weight = max(self.weights)
+
+    def _check_items(self, items):
+        used = self.item_used
+        for i, cond, effects, once in items:
+            if once and used[i]: continue
+            if cond(self):
+                effects(self)
+                if once: used[i] = True
+
+    def can_use(self, cid):
+        return self.lo.can_use[cid](self)
+
+    def draw_cards(self, num):
+        # 1枚ずつ pop する代わりに末尾からまとめて取る (引く順番は同じ)
+        hand = self.hand
+        num = min(num, MAX_HAND_SIZE - len(hand))
+        while num > 0:
+            deck = self.deck
+            if not deck:
+                if not self.discard: break
+                deck = self.deck = self.discard
+                self.discard = []
+                self.rng.shuffle(deck)
+            take = min(num, len(deck))
+            hand.extend(deck[:-take-1:-1])
+            del deck[-take:]
+            num -= take
+
+    def calculate_score(self, base, conc_rate=1.0, times=1):
+        # GameState.calculate_score と同じ式・同じ評価順 (浮動小数の丸めも一致させる)
+        buffs = self.buffs
+        boost_mult = 1.0 + (buffs[PARAM] * 0.1)
+        if buffs[PARAM30] > 0: boost_mult += 0.3
+        power = math.ceil((base + self.concentration * conc_rate) * boost_mult)
+        mult = 1.0
+        if buffs[GOOD] > 0:
+            mult = 1.5
+            if buffs[SUPER] > 0: mult += buffs[GOOD] * 0.1
+        self.score += math.ceil(power * mult * self.weights[self.turn-1]) * times
+
+    def start_turn(self):
+        lo = self.lo
+        turn = self.turn
+        ev = lo.turn_events[turn]
+        if ev: ev(self)
+        self.actions_remaining = 1
+        if lo.start_items: self._check_items(lo.start_items)
+        buffs = self.buffs
+        self.protection = [v == 0 for v in buffs]
+        draw_num = 3 + self.draw_reservations[turn] + self.next_turn_draw_bonus - len(self.hand)
+        self.next_turn_draw_bonus = 0
+        if draw_num > 0: self.draw_cards(draw_num)
+        if self.recurring:
+            active = []
+            for n, fn in self.recurring:
+                fn(self)
+                if n > 1: active.append((n - 1, fn))
+            self.recurring = active
+
+    def play_card(self, idx):
+        if self.actions_remaining <= 0 or not (0 <= idx < len(self.hand)): return False
+        cid = self.hand[idx]
+        if not self.lo.can_use[cid](self): return False
+        self.hand.pop(idx)
+        self._resolve_card(cid)
+        return True
+
+    def _resolve_card(self, cid):
+        lo = self.lo
+        card_type, conc_cost, cost, effects, scores_fixed, is_once = lo.specs[cid]
+        self.last_card_type = card_type
+        if conc_cost:
+            self.concentration -= cost
+        elif self.energy >= cost:
+            self.energy -= cost
+        else:
+            remain = cost - self.energy
+            self.energy = 0
+            self.hp = max(0, self.hp - remain)
+
+        perm = self.permanent
+        if card_type == 'mental' and perm[MENTAL_CONC] > 0:
+            self.concentration += math.ceil(perm[MENTAL_CONC] * (1.5 if self.buffs[CONC_BOOST] > 0 else 1.0))
+        if card_type == 'active' and perm[ACTIVE_CONC] > 0:
+            self.concentration += math.ceil(perm[ACTIVE_CONC] * (1.5 if self.buffs[CONC_BOOST] > 0 else 1.0))
+
+        repeats = 1
+        if self.double_charges > 0:
+            repeats = 2
+            self.double_charges -= 1
+        elif self.double_next_mental_only and card_type == 'mental':
+            repeats = 2
+            self.double_next_mental_only = False
+
+        for _ in range(repeats):
+            if scores_fixed and perm[ACTIVE_FIXED] > 0:
+                # 同じ局面での calculate_score(3) は毎回同じ値なので、回数倍して一度に足す
+                count = perm[ACTIVE_FIXED] // FIXED_UNIT
+                if count: self.calculate_score(FIXED_UNIT, 1.0, count)
+            effects(self)
+
+        if is_once: self.exile.append(cid)
+        else: self.discard.append(cid)
+
+        if self.summer_memory_active:
+            self.skill_use_count += 1
+            if self.skill_use_count % 5 == 0: self.calculate_score(4)
+
+        if lo.after_items: self._check_items(lo.after_items)
+        self.actions_remaining -= 1
+
+    def use_drink(self, idx):
+        if 0 <= idx < len(self.drinks):
+            self.lo.drink_effects[self.drinks.pop(idx)](self)
+            return True
+        return False
+
+    def end_turn(self):
+        if self.turn > self.max_turns: return
+        perm = self.permanent
+        buffs = self.buffs
+        if perm[TURN_END_CONC] > 0:
+            self.concentration += math.ceil(perm[TURN_END_CONC] * (1.5 if buffs[CONC_BOOST] > 0 else 1.0))
+        protection = self.protection
+        for k in range(5):
+            if buffs[k] > 0 and not protection[k]: buffs[k] -= 1
+        self.discard.extend(self.hand)
+        self.hand = []
+        self.turn += 1
+        reserved = self.reserved[self.turn]
+        if reserved:
+            for fn in reserved: fn(self)
+
+    def is_game_over(self):
+        return self.turn > self.max_turns
+
+    # ---- スナップショット / 復元 (先読みする方針用。GameState.snapshot / restore と同じ使い方) ----
+    _SNAPSHOT_SCALARS = ('turn', 'hp', 'energy', 'score', 'concentration',
+                         'double_charges', 'double_next_mental_only', 'summer_memory_active', 'skill_use_count',
+                         'last_card_type', 'actions_remaining', 'next_turn_draw_bonus')
+
+    def snapshot(self):
+        return (
+            tuple(getattr(self, k) for k in self._SNAPSHOT_SCALARS),
+            tuple(self.buffs), tuple(self.protection), tuple(self.permanent), tuple(self.draw_reservations),
+            tuple(self.reserved), tuple(self.recurring),
+            tuple(self.deck), tuple(self.hand), tuple(self.discard), tuple(self.exile),
+            tuple(self.item_used), tuple(self.drinks),
+            self.rng.getstate(),
+        )
+
+    def restore(self, snap, restore_rng=True):
+        """snapshot() の時点に戻す。restore_rng=False なら乱数の状態は進めたままにする"""
+        (scalars, buffs, protection, permanent, draws, reserved, recurring,
+         deck, hand, discard, exile, item_used, drinks, rng_state) = snap
+        for k, v in zip(self._SNAPSHOT_SCALARS, scalars): setattr(self, k, v)
+        self.buffs = list(buffs); self.protection = list(protection); self.permanent = list(permanent)
+        self.draw_reservations = list(draws)
+        self.reserved = list(reserved)
+        self.recurring = list(recurring)
+        self.deck = list(deck); self.hand = list(hand)
+        self.discard = list(discard); self.exile = list(exile)
+        self.item_used = list(item_used); self.drinks = list(drinks)
+        if restore_rng: self.rng.setstate(rng_state)
+
+    def branch(self):
+        """1手先読み用の複製。リストだけを複製し、ロードアウト由来の表は共有する。
+        乱数は最初にシャッフルするときに元の状態を写すので、複製をどう進めても元の乱数列は変わらない
+        (snapshot / restore より安い。idol_policies.outcomes が FastGameState で使う)"""
+        b = _new_state(FastGameState)
+        b.rng = _BranchRng(self.rng)
+        b.lo = self.lo; b.turn = self.turn; b.max_turns = self.max_turns
+        b.hp = self.hp; b.energy = self.energy; b.score = self.score; b.concentration = self.concentration
+        b.buffs = self.buffs[:]; b.protection = self.protection[:]; b.permanent = self.permanent[:]
+        b.double_charges = self.double_charges; b.double_next_mental_only = self.double_next_mental_only
+        b.summer_memory_active = self.summer_memory_active; b.skill_use_count = self.skill_use_count
+        b.last_card_type = self.last_card_type; b.actions_remaining = self.actions_remaining
+        b.next_turn_draw_bonus = self.next_turn_draw_bonus
+        b.draw_reservations = self.draw_reservations[:]; b.reserved = self.reserved[:]; b.recurring = self.recurring[:]
+        b.deck = self.deck[:]; b.hand = self.hand[:]; b.discard = self.discard[:]; b.exile = self.exile[:]
+        b.item_used = self.item_used[:]; b.drinks = self.drinks[:]
+        b.turn_info = self.turn_info; b.genres = self.genres; b.weights = self.weights; b.top_weight = self.top_weight
+        return b
+
+    # 行動の表し方は GameState と同じ (手札idx / ドリンクidx)
+    # 行動タプルは使い回す (手札は最大 MAX_HAND_SIZE 枚)
+    def legal_actions(self):
+        actions = []
+        if self.actions_remaining > 0:
+            can_use = self.lo.can_use
+            i = 0
+            for c in self.hand:
+                if can_use[c](self): actions.append(_CARD_ACTIONS[i])
+                i += 1
+        if self.drinks: actions.extend([('drink', i) for i in range(len(self.drinks))])
+        actions.append(_END)
+        return actions
+
+    def apply_action(self, action):
+        if action[0] == 'card': return self.play_card(action[1])
+        if action[0] == 'drink': return self.use_drink(action[1])
+        self.end_turn()
+        if self.turn <= self.max_turns: self.start_turn()
+        return True
+
+    def hand_names(self):
+        return [self.lo.names[c] for c in self.hand]
@@ -0,0 +1,22 @@
+# Pアイテム
+from .models import PItem
+
+def get_all_p_items():
+    items = []
+    items.append(PItem("しゅきハート+", "メンタル(集中13↑)", "after_action", 
+                       ('all', ('last_card_type', 'mental'), ('conc_at_least', 13)), 
+                       (('energy', 10), ('set', 'double_next_mental_only', True), ('draw', 2), ('actions', 1)), 
+                       is_once=True, image_path="item_syuki_heart.png"))
+    items.append(PItem("大荷物", "ダンス時行動+1", "turn_start", 
+                       ('genre', 'dance'), 
+                       (('actions', 1),), 
+                       is_once=True, image_path="item_hako.png"))
+    items.append(PItem("きっかけ", "ビジュアル時行動+1", "turn_start", 
+                       ('genre', 'visual'), 
+                       (('actions', 1),), 
+                       is_once=True, image_path="item_nakanaori.png"))
+    items.append(PItem("Tシャツ", "好調時行動+1", "turn_start", 
+                       ('buff_active', 'good_condition'), 
+                       (('actions', 1), ('buff', 'good_condition', 6)), 
+                       is_once=True, image_path="item_shirt.png"))
+    return {item.name: item for item in items}
@@ -0,0 +1,75 @@
+# 定義クラス (ゲーム間で共有し、プレイ中は変化しない)
+import collections
+
+from .events import EV_ITEM
+
+# カードの効果をロード時に解析したもの。エンジンはカード名ではなくこのフラグで分岐する
+#   scores_fixed : 使用時にアクティブ固定P を得点化する (固定P を積むカード自身は得点化しない)
+#   grants_fixed : active_score_fixed を積む
+CardSpec = collections.namedtuple('CardSpec', 'is_active is_mental pays_conc scores_fixed grants_fixed')
+
+def compile_card(card, scores_fixed=None):
+    grants_fixed = any(op[0] == 'permanent' and op[1] == 'active_score_fixed' for op in card.effects)
+    is_active = card.card_type == 'active'
+    return CardSpec(
+        is_active=is_active,
+        is_mental=card.card_type == 'mental',
+        pays_conc=card.cost_type == 'conc',
+        scores_fixed=(is_active and not grants_fixed) if scores_fixed is None else scores_fixed,
+        grants_fixed=grants_fixed,
+    )
+
+class Card:
+    def __init__(self, name, cost_type, cost_value, card_type, effects, requires=None, is_once=False, rarity='N', description="", image_path=None, scores_fixed=None):
+        self.name = name
+        self.cost_type = cost_type
+        self.cost_value = cost_value
+        self.card_type = card_type
+        self.effects = effects
+        self.requires = requires
+        self.is_once = is_once
+        self.rarity = rarity
+        self.description = description
+        self.image_path = image_path if image_path else "placeholder.png"
+        # scores_fixed を明示しなければ効果から決める
+        self.spec = compile_card(self, scores_fixed)
+    
+    def can_use(self, state):
+        if self.cost_type == 'conc' and state.concentration < self.cost_value: return False
+        if self.cost_type == 'hp' and state.hp < self.cost_value: return False
+        return state.check_condition(self.requires) if self.requires else True
+
+class PItem:
+    def __init__(self, name, description, trigger_type, condition, effects, is_once=True, image_path=None):
+        self.name = name
+        self.description = description
+        self.trigger_type = trigger_type
+        self.condition = condition
+        self.effects = effects
+        self.is_once = is_once
+        self.image_path = image_path if image_path else "placeholder.png"
+    
+    # 発動済みフラグは定義側ではなく GameState.item_used[idx] に持つ (定義はゲーム間で共有)
+    def check(self, state, idx):
+        if self.is_once and state.item_used[idx]: return False
+        if state.check_condition(self.condition):
+            state.run_ops(self.effects)
+            if self.is_once: state.item_used[idx] = True
+            if state.events is not None: state.emit(EV_ITEM, self.name)
+            return True
+        return False
+
+class Drink:
+    def __init__(self, name, description, effects, image_path=None):
+        self.name = name
+        self.description = description
+        self.effects = effects
+        self.image_path = image_path if image_path else "placeholder.png"
+
+class Character:
+    def __init__(self, name, genres, unique_card, unique_p_item, turn_events=None):
+        self.name = name
+        self.genres = genres
+        self.unique_card = unique_card
+        self.unique_p_item = unique_p_item
+        self.turn_events = turn_events if turn_events else {}
@@ -0,0 +1,33 @@
+# ---- 効果の記述 (op レコード) ----
+# カード・Pアイテム・ドリンク・キャラのターンイベント・予約/継続効果は関数ではなく
+# タプル (op名, 引数...) の列で表し、GameState.run_ops() が解釈する。
+# ラムダを持たないので GameState ごと pickle / ハッシュできる。
+def _op_redraw_hand(s, extra):
+    # 手札を全て捨てて、捨てた枚数 + extra 枚引き直す
+    ct = len(s.hand); s.discard.extend(s.hand); s.hand = []; s.draw_cards(ct + extra)
+
+OPS = {
+    'score':        lambda s, base, conc_rate=1.0: s.calculate_score(base, conc_rate=conc_rate),
+    'draw':         lambda s, n: s.draw_cards(n),
+    'actions':      lambda s, n: setattr(s, 'actions_remaining', s.actions_remaining + n),
+    'conc':         lambda s, n: s.add_concentration(n),
+    'buff':         lambda s, key, turns: s.add_buff(key, turns),
+    'permanent':    lambda s, key, val: s.add_permanent_buff(key, val),
+    'energy':       lambda s, n: setattr(s, 'energy', s.energy + n),
+    'hp':           lambda s, n: setattr(s, 'hp', s.hp + n),
+    'double':       lambda s, n: setattr(s, 'double_charges', s.double_charges + n),
+    'set':          lambda s, attr, value: setattr(s, attr, value),
+    'reserve_draw': lambda s, turns_later, n: s.reserve_draw(turns_later, n),
+    'reserve':      lambda s, turns_later, ops: s.reserve_effect(turns_later, ops),
+    'recurring':    lambda s, turns, ops, desc: s.add_recurring_effect(turns, ops, desc),
+    'redraw_hand':  _op_redraw_hand,
+}
+
+CONDITIONS = {
+    'turn_at_least': lambda s, n: s.turn >= n,
+    'genre':         lambda s, genre: s.turn_info[s.turn-1]['genre'] == genre,
+    'buff_active':   lambda s, key: s.buffs[key] > 0,
+    'last_card_type': lambda s, card_type: s.last_card_type == card_type,
+    'conc_at_least': lambda s, n: s.concentration >= n,
+    'all':           lambda s, *conds: all(s.check_condition(c) for c in conds),
+}
@@ -0,0 +1,7 @@
+# 評価
+import math
+
+def get_rank(score):
+    base = 9957
+    exam = 1500 + 750 + 800 + 400 + 0.01* (score - 40000)
+    return math.ceil(base + exam)
@@ -0,0 +1,434 @@
+# ゲームの状態とターンスケジュール
+import collections
+import math
+import random
+
+from .config import MAX_TURNS, MAX_HP, INITIAL_ENERGY, FIXED_UNIT
+from .ops import OPS, CONDITIONS
+from .events import EventBuffer, format_event, EV_SCORE, EV_DOUBLE, EV_ENCORE, EV_DRINK, EV_BUFF, EV_DRAW, EV_PLAY
+
+class GameState:
+    # 状態を変える操作 (play_card / use_drink / start_turn / end_turn / restore) のたびに増える。
+    # UI はこの値が同じ間は表示用の計算結果 (preview_actions) を使い回す。
+    version = 0
+    _preview = None
+
+    def __init__(self, character, deck, p_items, drinks=None, verbose=True, rng=None, turn_info=None):
+        # 乱数はインスタンスごとに注入可能 (未指定なら新しい Random を作る)
+        self.rng = rng if rng is not None else random.Random()
+        self.turn = 1
+        self.max_turns = MAX_TURNS
+        self.hp = MAX_HP
+        self.energy = INITIAL_ENERGY
+        self.score = 0
+        self.score_gain_display = 0 
+        
+        self.verbose = verbose
+        self.concentration = 0
+        # buffsに param_boost_30 (30%固定強化) を追加
+        self.buffs = {'good_condition': 0, 'super_good': 0, 'conc_boost': 0, 'param_boost': 0, 'param_boost_30': 0}
+        self.buff_protection = {k: False for k in self.buffs}
+        self.permanent_buffs = {'mental_conc': 0, 'active_conc': 0, 'active_score_fixed': 0, 'turn_end_conc': 0}
+        
+        self.double_charges = 0 
+        self.double_next_mental_only = False
+        self.summer_memory_active = False
+        self.skill_use_count = 0
+        self.last_card_type = None
+        
+        self.draw_reservations = collections.defaultdict(int)
+        self.reserved_effects = collections.defaultdict(list)
+        self.recurring_effects = []
+        # verbose=False (シミュレーション) ではイベントを一切記録しない
+        self.events = EventBuffer() if verbose else None
+        self.turn_mark = 0
+        # 使用したカードの全記録 [(ターン, カード名)]。イベントのリングバッファと違って verbose に関係なく残り、切り詰めない
+        self.played = []
+
+        # Card / PItem / Drink はプレイ中に変化しない定義なので、コピーせず参照を共有する
+        self.deck = list(deck)
+        self.rng.shuffle(self.deck)
+        self.hand = []
+        self.discard = []
+        self.exile = []
+        # キャラ固有アイテム + 選択アイテム
+        self.p_items = list(p_items)
+        self.item_used = [False] * len(self.p_items)
+        self.drinks = list(drinks) if drinks else []
+        self.turn_events = character.turn_events
+        # turn_info を渡すとそのスケジュールに固定する (全列挙での期待値計算用)
+        self.turn_info = list(turn_info) if turn_info is not None else self._generate_turn_schedule(character.genres)
+        self.actions_remaining = 1
+        self.next_turn_draw_bonus = 0
+
+    # イベントの記録。呼び出し側で self.events is not None を確認してから呼ぶ
+    def emit(self, kind, *args):
+        self.events.append(self.turn, kind, args)
+
+    @property
+    def game_logs(self):
+        """現在のターンのログ (表示用の文字列はここで初めて作る)"""
+        if self.events is None: return []
+        return [m for m in map(format_event, self.events.since(self.turn_mark)) if m]
+
+    @property
+    def history(self):
+        """{ターン: [使用したカード名]}"""
+        played = collections.defaultdict(list)
+        for turn, name in self.played: played[turn].append(name)
+        return played
+
+    def run_ops(self, ops):
+        for op in ops: OPS[op[0]](self, *op[1:])
+
+    def check_condition(self, cond):
+        return CONDITIONS[cond[0]](self, *cond[1:])
+
+    def clone(self, rng=None):
+        """探索用の軽量コピー (定義は共有し、可変な状態だけ複製する)"""
+        c = GameState.__new__(GameState)
+        c.__dict__.update(self.__dict__)
+        if rng is not None: c.rng = rng
+        c.buffs = dict(self.buffs)
+        c.buff_protection = dict(self.buff_protection)
+        c.permanent_buffs = dict(self.permanent_buffs)
+        c.draw_reservations = collections.defaultdict(int, self.draw_reservations)
+        c.reserved_effects = collections.defaultdict(list, {t: list(fs) for t, fs in self.reserved_effects.items()})
+        c.recurring_effects = [dict(e) for e in self.recurring_effects]
+        c.events = None; c.verbose = False
+        c.deck = list(self.deck); c.hand = list(self.hand)
+        c.discard = list(self.discard); c.exile = list(self.exile)
+        c.item_used = list(self.item_used)
+        c.played = list(self.played)
+        c.drinks = list(self.drinks)
+        c.turn_info = list(self.turn_info)
+        return c
+
+    # ---- スナップショット / 復元 (undo・分岐探索用) ----
+    # 可変なスカラー値と各ゾーンのタプルだけを記録する。タプルは不変なので
+    # 復元後にリストを作り直すまで共有でき、deepcopy は一切行わない。
+    _SNAPSHOT_SCALARS = ('turn', 'hp', 'energy', 'score', 'score_gain_display', 'concentration',
+                         'double_charges', 'double_next_mental_only', 'summer_memory_active',
+                         'skill_use_count', 'last_card_type', 'actions_remaining', 'next_turn_draw_bonus',
+                         'turn_mark')
+
+    def snapshot(self):
+        return (
+            tuple(getattr(self, k) for k in self._SNAPSHOT_SCALARS),
+            tuple(self.buffs.values()), tuple(self.buff_protection.values()), tuple(self.permanent_buffs.values()),
+            tuple(self.draw_reservations.items()),
+            tuple((t, tuple(fs)) for t, fs in self.reserved_effects.items() if fs),
+            tuple((e['turns'], e['ops'], e['desc']) for e in self.recurring_effects),
+            tuple(self.deck), tuple(self.hand), tuple(self.discard), tuple(self.exile),
+            tuple(self.drinks), tuple(self.item_used), tuple(self.turn_info),
+            self.events.count if self.events is not None else 0, len(self.played),
+            self.rng.getstate(),
+        )
+
+    def restore(self, snap, restore_rng=True):
+        """snapshot() の時点に戻す。restore_rng=False なら乱数の状態は進めたままにする"""
+        # version は巻き戻さない (戻した後の手で、以前の別の局面と同じ番号にならないように)
+        self.version += 1
+        (scalars, buffs, protection, permanent, draws, reserved, recurring,
+         deck, hand, discard, exile, drinks, item_used, turn_info, event_count, played_count, rng_state) = snap
+        for k, v in zip(self._SNAPSHOT_SCALARS, scalars): setattr(self, k, v)
+        for k, v in zip(self.buffs, buffs): self.buffs[k] = v
+        for k, v in zip(self.buff_protection, protection): self.buff_protection[k] = v
+        for k, v in zip(self.permanent_buffs, permanent): self.permanent_buffs[k] = v
+        self.draw_reservations = collections.defaultdict(int, draws)
+        self.reserved_effects = collections.defaultdict(list, {t: list(fs) for t, fs in reserved})
+        self.recurring_effects = [{'turns': n, 'ops': ops, 'desc': d} for n, ops, d in recurring]
+        self.deck = list(deck); self.hand = list(hand)
+        self.discard = list(discard); self.exile = list(exile)
+        self.drinks = list(drinks); self.item_used = list(item_used)
+        self.turn_info = list(turn_info)
+        if self.events is not None: self.events.truncate(event_count)
+        del self.played[played_count:]
+        if restore_rng: self.rng.setstate(rng_state)
+
+    def state_key(self):
+        """局面の正規化キー。行動順が違っても同じ局面なら同じ値になる (スコアは含まない)"""
+        names = lambda cards: tuple(sorted(c.name for c in cards))
+        return (
+            self.turn, self.hp, self.energy, self.concentration, self.actions_remaining,
+            tuple(self.buffs.values()), tuple(self.buff_protection.values()), tuple(self.permanent_buffs.values()),
+            self.double_charges, self.double_next_mental_only, self.summer_memory_active,
+            self.skill_use_count % 5, self.next_turn_draw_bonus,
+            names(self.hand), names(self.deck), names(self.discard),
+            names(self.drinks), tuple(zip((p.name for p in self.p_items), self.item_used)),
+            tuple((t, n) for t, n in sorted(self.draw_reservations.items()) if t >= self.turn and n),
+            tuple((t, tuple(effs)) for t, effs in sorted(self.reserved_effects.items()) if t > self.turn and effs),
+            tuple((e['turns'], e['ops']) for e in self.recurring_effects),
+            tuple(t['genre'] for t in self.turn_info[self.turn-1:]),
+        )
+
+    def _generate_turn_schedule(self, preference):
+        schedule, pool = _schedule_template(preference)
+        self.rng.shuffle(pool)
+        for i in range(12):
+            if schedule[i] is None: schedule[i] = pool.pop()
+        return schedule
+
+    def _reshuffle(self):
+        # 捨て札を山札に戻してシャッフル
+        self.deck = self.discard[:]
+        self.discard = []
+        self.rng.shuffle(self.deck)
+
+    def draw_cards(self, num):
+        MAX_HAND_SIZE = 5
+        before = len(self.hand)
+        for _ in range(num):
+            if len(self.hand) >= MAX_HAND_SIZE: break
+            if not self.deck:
+                if not self.discard: break
+                self._reshuffle()
+            if self.deck:
+                self.hand.append(self.deck.pop())
+        if self.events is not None and len(self.hand) > before: self.emit(EV_DRAW, len(self.hand) - before)
+
+    def calculate_score(self, base, conc_rate=1.0, times=1):
+        # param_boost (1つ10%) と param_boost_30 (固定30%) を計算
+        # ブーストエキス: 30%固定がONなら +0.3
+        # センブリなど: param_boost * 0.1
+        boost_mult = 1.0 + (self.buffs['param_boost'] * 0.1)
+        if self.buffs['param_boost_30'] > 0:
+            boost_mult += 0.3
+            
+        added_conc = self.concentration * conc_rate
+        power = (base + added_conc) * boost_mult
+        power = math.ceil(power)
+        
+        mult = 1.0
+        if self.buffs['good_condition'] > 0:
+            mult = 1.5
+            if self.buffs['super_good'] > 0:
+                mult += self.buffs['good_condition'] * 0.1
+        genre_w = self.turn_info[self.turn-1]['weight']
+        # times 回続けて呼ぶのと同じ (局面が変わらないので毎回同じ値になる)
+        score = math.ceil(power * mult * genre_w) * times
+        
+        self.score += score
+        self.score_gain_display += score
+        if self.events is not None: self.emit(EV_SCORE, score)
+
+    def start_turn(self):
+        self.version += 1
+        if self.events is not None: self.turn_mark = self.events.count
+        self.score_gain_display = 0
+        if self.turn in self.turn_events: self.run_ops(self.turn_events[self.turn])
+        self.actions_remaining = 1
+        for i, p in enumerate(self.p_items):
+            if p.trigger_type == 'turn_start': p.check(self, i)
+        for k, v in self.buffs.items(): self.buff_protection[k] = (v == 0)
+        
+        reserved = self.draw_reservations[self.turn] + self.next_turn_draw_bonus
+        self.next_turn_draw_bonus = 0
+        draw_num = 3 + reserved - len(self.hand)
+        if draw_num > 0: self.draw_cards(draw_num)
+        
+        active_recurring = []
+        for eff in self.recurring_effects:
+            self.run_ops(eff['ops'])
+            eff['turns'] -= 1
+            if eff['turns'] > 0: active_recurring.append(eff)
+        self.recurring_effects = active_recurring
+
+    def play_card(self, idx):
+        self.version += 1
+        self.score_gain_display = 0
+        if self.actions_remaining <= 0 or not (0 <= idx < len(self.hand)): return False
+        card = self.hand[idx]
+        if not card.can_use(self): return False
+
+        self.hand.pop(idx)
+        self.played.append((self.turn, card.name))
+        if self.events is not None: self.emit(EV_PLAY, card.name)
+        self._resolve_card(card)
+        return True
+
+    def _resolve_card(self, card):
+        # 手札から出した後の処理 (コスト・集中・効果・Pアイテム・行動消費)
+        spec = card.spec
+        self.last_card_type = card.card_type
+
+        if spec.pays_conc:
+            self.concentration -= card.cost_value
+        else:
+            actual = card.cost_value
+            if self.energy >= actual:
+                self.energy -= actual
+            else:
+                remain = actual - self.energy
+                self.energy = 0
+                self.hp = max(0, self.hp - remain)
+        
+        if spec.is_mental and self.permanent_buffs['mental_conc'] > 0:
+            self.concentration += math.ceil(self.permanent_buffs['mental_conc'] * (1.5 if self.buffs['conc_boost']>0 else 1.0))
+        if spec.is_active and self.permanent_buffs['active_conc'] > 0:
+            self.concentration += math.ceil(self.permanent_buffs['active_conc'] * (1.5 if self.buffs['conc_boost']>0 else 1.0))
+
+        repeats = 1
+        if self.double_charges > 0:
+            repeats = 2
+            self.double_charges -= 1
+            if self.events is not None: self.emit(EV_DOUBLE, card.name)
+        elif self.double_next_mental_only and spec.is_mental:
+            repeats = 2
+            self.double_next_mental_only = False
+            if self.events is not None: self.emit(EV_ENCORE, card.name)
+
+        for _ in range(repeats):
+            if spec.scores_fixed:
+                # アクティブ固定P: FIXED_UNIT ごとの calculate_score(3) を1回の計算でまとめて足す
+                count = self.permanent_buffs['active_score_fixed'] // FIXED_UNIT
+                if count > 0: self.calculate_score(FIXED_UNIT, times=count)
+            self.run_ops(card.effects)
+
+        if card.is_once: self.exile.append(card)
+        else: self.discard.append(card)
+
+        if self.summer_memory_active:
+            self.skill_use_count += 1
+            if self.skill_use_count % 5 == 0: self.calculate_score(4)
+        
+        for i, p in enumerate(self.p_items):
+            if p.trigger_type == 'after_action': p.check(self, i)
+
+        self.actions_remaining -= 1
+
+    def use_drink(self, idx):
+        self.version += 1
+        self.score_gain_display = 0
+        if 0 <= idx < len(self.drinks):
+            drink = self.drinks.pop(idx)
+            if self.events is not None: self.emit(EV_DRINK, drink.name)
+            self.run_ops(drink.effects)
+            return True
+        return False
+
+    def end_turn(self):
+        self.version += 1
+        self.score_gain_display = 0
+        if self.is_game_over(): return
+        if self.permanent_buffs['turn_end_conc'] > 0:
+            self.concentration += math.ceil(self.permanent_buffs['turn_end_conc'] * (1.5 if self.buffs['conc_boost']>0 else 1.0))
+        for k in self.buffs:
+            if self.buffs[k] > 0 and not self.buff_protection[k]: self.buffs[k] -= 1
+        
+        self.discard.extend(self.hand)
+        self.hand = []
+        self.turn += 1
+        for ops in self.reserved_effects[self.turn]: self.run_ops(ops)
+
+    def is_game_over(self):
+        return self.turn > self.max_turns
+
+    def preview_actions(self):
+        """([(使用可否, 予測獲得スコア)] 手札順, [予測獲得スコア] ドリンク順)。
+
+        実際に1手進めてから snapshot の時点に戻すので、ドローや乱数を含めて実際の結果と一致する。
+        version が変わるまでは前回の結果を返す (UI の再描画では再計算しない)。
+        """
+        cached = self._preview
+        if cached is not None and cached[0] == self.version: return cached[1]
+        if self.is_game_over(): return [(False, None)] * len(self.hand), [None] * len(self.drinks)
+        version, events = self.version, self.events
+        snap = self.snapshot()
+        self.events = None
+        cards, drinks = [], []
+        try:
+            # restore で self.hand は別のリストに置き換わるので、元の手札のコピーを回す
+            for i, card in enumerate(tuple(self.hand)):
+                ok = self.actions_remaining > 0 and card.can_use(self)
+                gain = None
+                if ok:
+                    before = self.score
+                    self.play_card(i)
+                    gain = self.score - before
+                    self.restore(snap)
+                cards.append((ok, gain))
+            for i in range(len(self.drinks)):
+                before = self.score
+                self.use_drink(i)
+                drinks.append(self.score - before)
+                self.restore(snap)
+        finally:
+            self.events, self.version = events, version
+        self._preview = (version, (cards, drinks))
+        return cards, drinks
+
+    # 行動は ('card', 手札idx) / ('drink', ドリンクidx) / ('end',) のタプルで表す
+    def legal_actions(self):
+        actions = []
+        if self.actions_remaining > 0:
+            actions.extend(('card', i) for i, c in enumerate(self.hand) if c.can_use(self))
+        actions.extend(('drink', i) for i in range(len(self.drinks)))
+        actions.append(('end',))
+        return actions
+
+    def hand_names(self):
+        return [c.name for c in self.hand]
+
+    def apply_action(self, action):
+        if action[0] == 'card': return self.play_card(action[1])
+        if action[0] == 'drink': return self.use_drink(action[1])
+        self.end_turn()
+        if not self.is_game_over(): self.start_turn()
+        return True
+
+    def add_permanent_buff(self, type, val):
+        if type in self.permanent_buffs: self.permanent_buffs[type] += val
+    def add_concentration(self, amount):
+        mult = 1.5 if self.buffs['conc_boost'] > 0 else 1.0
+        self.concentration += math.ceil(amount * mult)
+    def add_buff(self, key, turns):
+        if self.buffs[key] == 0: self.buff_protection[key] = True
+        self.buffs[key] += turns
+        if self.events is not None: self.emit(EV_BUFF, key, turns)
+    def reserve_draw(self, turns_later, amount):
+        if self.turn + turns_later <= self.max_turns: self.draw_reservations[self.turn + turns_later] += amount
+    def reserve_effect(self, turns_later, ops, desc=""):
+        if self.turn + turns_later <= self.max_turns: self.reserved_effects[self.turn + turns_later].append(ops)
+    def add_recurring_effect(self, turns, ops, desc="継続効果"):
+        self.recurring_effects.append({'turns': turns, 'ops': ops, 'desc': desc})
+
+# ---- ターンスケジュール ----
+def _schedule_template(preference):
+    # 1, 10, 11, 12 ターン目は固定。残り8枠に pool をシャッフルして入れる
+    p1 = {'genre': preference[0], 'weight': 19.0, 'color': '#1f77b4'}
+    p2 = {'genre': preference[1], 'weight': 14.0, 'color': '#ffcc00'}
+    p3 = {'genre': preference[2], 'weight': 8.0,  'color': '#d62728'}
+    schedule = [None] * 12
+    schedule[0] = p1; schedule[11] = p1
+    schedule[9] = p3; schedule[10] = p2
+    pool = [p1]*4 + [p2]*3 + [p3]*1
+    return schedule, pool
+
+def enumerate_turn_schedules(preference):
+    """_generate_turn_schedule が取りうる全スケジュールと確率の組 [(turn_info, weight)]
+
+    pool のシャッフルは一様なので、相異なる並び (8!/(4!3!1!) = 280 通り) は全て等確率。
+    """
+    template, pool = _schedule_template(preference)
+    free = [i for i, t in enumerate(template) if t is None]
+    tiers = list({id(t): t for t in pool}.values())
+    counts = [sum(1 for t in pool if t is tier) for tier in tiers]
+
+    def orders(prefix):
+        if len(prefix) == len(free):
+            yield prefix
+            return
+        for k, tier in enumerate(tiers):
+            if counts[k]:
+                counts[k] -= 1
+                yield from orders(prefix + (tier,))
+                counts[k] += 1
+
+    schedules = []
+    for order in orders(()):
+        schedule = list(template)
+        for slot, tier in zip(free, order): schedule[slot] = tier
+        schedules.append(schedule)
+    weight = 1.0 / len(schedules)
+    return [(schedule, weight) for schedule in schedules]
@@ -0,0 +1,155 @@
+# 固定の行動列に対する厳密なスコア評価器
+#   ターンスケジュールと行動列 [('card', 名前) / ('drink', 名前) / ('end',)] を受け取り、
+#   本体エンジンと同じ計算で最終スコアを返す。ログ・手札・山札は扱わない。
+#   得点に関わる状態 (バフ・集中・予約効果など) だけをタプルに凍結し、
+#   (状態, 行動) -> (次の状態, 獲得スコア) をメモ化する動的計画法で評価するので、
+#   共通の途中局面を持つ候補ラインは一度しか計算しない。
+#   greedy_line() はドローを無視した貪欲ラインを作り、idol_optimizer の候補の事前選別に使う。
+import random
+
+from idol_engine import MAX_HP, INITIAL_ENERGY, GameState, get_full_card_pool, get_all_drinks
+
+class _EvalState(GameState):
+    """得点計算だけを行う GameState (イベント記録・ドローは何もしない)"""
+    def __init__(self, character, p_items, turn_info):
+        # 通常のコンストラクタで全属性を作る (山札は空、状態は評価のたびに _thaw で上書きする)
+        super().__init__(character, (), p_items, verbose=False, rng=random.Random(0), turn_info=turn_info)
+        self.max_turns = len(turn_info)
+
+    def draw_cards(self, num):
+        pass
+
+# 凍結する属性 (スコアは含めず、遷移ごとの獲得量として別に返す)
+_SCALARS = ('turn', 'hp', 'energy', 'concentration', 'actions_remaining',
+            'double_charges', 'double_next_mental_only', 'summer_memory_active',
+            'skill_use_count', 'last_card_type', 'next_turn_draw_bonus')
+
+def _freeze(s):
+    return (
+        tuple(getattr(s, k) for k in _SCALARS),
+        tuple(s.buffs.values()), tuple(s.buff_protection.values()), tuple(s.permanent_buffs.values()),
+        tuple(s.item_used),
+        tuple((t, tuple(effs)) for t, effs in sorted(s.reserved_effects.items()) if t > s.turn and effs),
+        tuple((e['turns'], e['ops'], e['desc']) for e in s.recurring_effects),
+    )
+
+_BUFF_KEYS = ('good_condition', 'super_good', 'conc_boost', 'param_boost', 'param_boost_30')
+_PERMANENT_KEYS = ('mental_conc', 'active_conc', 'active_score_fixed', 'turn_end_conc')
+
+def _thaw(s, frozen):
+    scalars, buffs, protection, permanent, item_used, reserved, recurring = frozen
+    for k, v in zip(_SCALARS, scalars): setattr(s, k, v)
+    # 夏夜に咲く思い出は5回ごとなので、凍結時の剰余から数え直しても結果は同じ
+    s.skill_use_count %= 5
+    s.buffs = dict(zip(_BUFF_KEYS, buffs))
+    s.buff_protection = dict(zip(_BUFF_KEYS, protection))
+    s.permanent_buffs = dict(zip(_PERMANENT_KEYS, permanent))
+    s.item_used = list(item_used)
+    s.reserved_effects = _ReservedEffects((t, list(effs)) for t, effs in reserved)
+    s.recurring_effects = [{'turns': n, 'ops': ops, 'desc': d} for n, ops, d in recurring]
+    s.draw_reservations = _NoDraws()
+    # _resolve_card が使ったカードを捨て札・除外に積むので、評価のたびに空に戻す (得点には影響しない)
+    s.hand, s.discard, s.exile = [], [], []
+    s.score = 0
+    s.score_gain_display = 0
+
+class _ReservedEffects(dict):
+    def __missing__(self, key):
+        value = self[key] = []
+        return value
+
+class _NoDraws(dict):
+    # ドロー予約は得点に影響しないので常に 0
+    def __missing__(self, key):
+        return 0
+    def __setitem__(self, key, value):
+        pass
+
+class LineEvaluator:
+    """turn_info (GameState.turn_info と同じ形式) 上で行動列の最終スコアを計算する"""
+    def __init__(self, character, p_items, turn_info, card_pool=None, drink_pool=None, memo_size=1_000_000):
+        self.state = _EvalState(character, p_items, turn_info)
+        self.unique_card = character.unique_card
+        self.cards = dict(card_pool or get_full_card_pool())
+        if character.unique_card: self.cards.setdefault(character.unique_card.name, character.unique_card)
+        self.drinks = dict(drink_pool or get_all_drinks())
+        self.memo = {}
+        self.memo_size = memo_size
+        self.hits = 0
+        self.misses = 0
+        self.root, self.root_gain = self._initial()
+
+    def _initial(self):
+        s = self.state
+        scalars = (1, MAX_HP, INITIAL_ENERGY, 0, 1, 0, False, False, 0, None, 0)
+        _thaw(s, (scalars, (0,) * 5, (False,) * 5, (0,) * 4, (False,) * len(s.p_items), (), ()))
+        s.start_turn()
+        return _freeze(s), s.score
+
+    def step(self, frozen, action):
+        """(次の状態, 獲得スコア) を返す。メモにあれば再計算しない"""
+        key = (frozen, action)
+        hit = self.memo.get(key)
+        if hit is not None:
+            self.hits += 1
+            return hit
+        self.misses += 1
+        s = self.state
+        _thaw(s, frozen)
+        kind = action[0]
+        if kind == 'card':
+            s._resolve_card(self.cards[action[1]])
+        elif kind == 'drink':
+            s.run_ops(self.drinks[action[1]].effects)
+        else:
+            s.end_turn()
+            if not s.is_game_over(): s.start_turn()
+        result = (_freeze(s), s.score)
+        if len(self.memo) >= self.memo_size: self.memo.clear()
+        self.memo[key] = result
+        return result
+
+    def usable(self, frozen, name):
+        """frozen の局面でカード name を使えるか (行動数・コスト・使用条件)"""
+        s = self.state
+        _thaw(s, frozen)
+        return s.actions_remaining > 0 and self.cards[name].can_use(s)
+
+    def evaluate(self, actions):
+        """行動列を最後まで適用した最終スコア (ゲーム終了後の行動は無視する)"""
+        frozen, total = self.root, self.root_gain
+        for action in actions:
+            if frozen[0][0] > self.state.max_turns: break
+            frozen, gain = self.step(frozen, action)
+            total += gain
+        return total
+
+def greedy_line(evaluator, deck_list):
+    """ドローを無視し、毎ターン デッキの全カードを手札とみなした貪欲ライン (行動列, 最終スコア)。
+    各手で獲得スコアが最大のカードを使い (1回きりのカードは1ゲームに枚数分、他は1ターンに枚数分)、
+    使えるカードがなくなればターンを終える。実際のプレイより楽観的な、デッキの伸びしろの目安"""
+    deck_list = dict(deck_list)
+    if evaluator.unique_card: deck_list[evaluator.unique_card.name] = deck_list.get(evaluator.unique_card.name, 0) + 1
+    frozen, total = evaluator.root, evaluator.root_gain
+    max_turns = evaluator.state.max_turns
+    once_left = {n: c for n, c in deck_list.items() if evaluator.cards[n].is_once}
+    line = []
+    while frozen[0][0] <= max_turns:
+        turn_left = {n: c for n, c in deck_list.items() if not evaluator.cards[n].is_once}
+        turn_left.update((n, c) for n, c in once_left.items() if c > 0)
+        while True:
+            best = None
+            for name, left in turn_left.items():
+                if left <= 0 or not evaluator.usable(frozen, name): continue
+                nxt, gain = evaluator.step(frozen, ('card', name))
+                if best is None or gain > best[2]: best = (name, nxt, gain)
+            if best is None: break
+            name, frozen, gain = best
+            total += gain
+            line.append(('card', name))
+            turn_left[name] -= 1
+            if name in once_left: once_left[name] -= 1
+        frozen, gain = evaluator.step(frozen, ('end',))
+        total += gain
+        line.append(('end',))
+    return line, total
@@ -0,0 +1,134 @@
+# 先読みするプレイ方針のライブラリ
+#   方針は policy(state, rng) -> 行動 ('card', i) / ('drink', i) / ('end',) の関数 (idol_sim と同じ形)。
+#   1手先読みは GameState では snapshot / restore、FastGameState では branch() した複製で行い、
+#   どちらでも同じ手を選ぶ。
+#   方針の登録表は idol_sim.POLICIES の1つだけで、ここの方針もそこに名前で載る
+#   (idol_sim --policy・idol_optimizer・分析ページ・トーナメントで共通)。
+#   方針どうしの比較は idol_tournament。
+import collections
+
+from idol_engine.fast import GOOD, SUPER, FastGameState
+
+# ==========================================
+# 1. 1手先読み
+# ==========================================
+# 合法手 (ターン終了以外) を1つずつ実際に適用して、変化量を測ってから戻す。
+# snapshot は乱数の状態も含み、branch() は乱数を写してから使うので、先読みしてもゲームの乱数列は変わらない (CRN が崩れない)。
+# name は使うカードの名前 (ドリンクなら None)。
+Outcome = collections.namedtuple('Outcome', 'action name gain conc buffs hp')
+
+def _good_turns(state):
+    # GameState は {バフ名: ターン数}、FastGameState は BUFF_KEYS 順のリスト
+    b = state.buffs
+    return b['good_condition'] + b['super_good'] if isinstance(b, dict) else b[GOOD] + b[SUPER]
+
+def outcomes(state):
+    """[Outcome(行動, カード名 or None, 獲得スコア, 集中の増分, 好調+絶好調ターンの増分, 体力の増分)]"""
+    if isinstance(state, FastGameState): return _branch_outcomes(state)
+    snap = state.snapshot()
+    # GameState は先読み中のイベントを記録しない
+    events = state.events
+    state.events = None
+    names = state.hand_names()
+    result = []
+    try:
+        for action in state.legal_actions():
+            if action[0] == 'end': continue
+            name = names[action[1]] if action[0] == 'card' else None
+            score, conc, hp, buffs = state.score, state.concentration, state.hp, _good_turns(state)
+            state.apply_action(action)
+            result.append(Outcome(action, name, state.score - score, state.concentration - conc,
+                                  _good_turns(state) - buffs, state.hp - hp))
+            state.restore(snap)
+    finally:
+        state.events = events
+    return result
+
+def _branch_outcomes(state):
+    # FastGameState は手ごとに branch() した複製を進める (元の状態と乱数には触れないので戻す必要がない)
+    names = state.hand_names()
+    score, conc, hp, buffs = state.score, state.concentration, state.hp, _good_turns(state)
+    result = []
+    for action in state.legal_actions():
+        if action[0] == 'end': continue
+        b = state.branch()
+        b.apply_action(action)
+        result.append(Outcome(action, names[action[1]] if action[0] == 'card' else None, b.score - score,
+                              b.concentration - conc, _good_turns(b) - buffs, b.hp - hp))
+    return result
+
+def heavy_turn(state):
+    """今のターンの倍率が、この後のどのターンよりも大きいか (残り2ターン以下なら常に真)。
+    序盤にも最大倍率のターンが並ぶので、同じ倍率のターンが後に残っていれば温存を続ける"""
+    weights = [t['weight'] for t in state.turn_info[state.turn-1:]]
+    return len(weights) <= 2 or weights[0] > max(weights[1:])
+
+# ==========================================
+# 2. 方針
+# ==========================================
+def _greedy(options):
+    # 獲得スコア最大 (同点なら左のカード、カードはドリンクより先)。何も増えなければ左のカード、なければターン終了
+    if not options: return ('end',)
+    best = max(options, key=lambda o: o.gain)
+    if best.gain > 0: return best.action
+    for o in options:
+        if o.name is not None: return o.action
+    return ('end',)
+
+def greedy_policy(state, rng):
+    """その手で増えるスコアが最大の行動"""
+    return _greedy(outcomes(state))
+
+def concentration_policy(state, rng):
+    """集中が増えるカードを先に使う (増える量が多い順)。なければ greedy"""
+    options = outcomes(state)
+    conc = [o for o in options if o.name is not None and o.conc > 0]
+    if conc: return max(conc, key=lambda o: (o.conc, o.gain)).action
+    return _greedy(options)
+
+def timing_policy(state, rng):
+    """ドリンクは heavy_turn() まで温存し、そのターンに最優先で使う。カードは greedy
+    (カードも温存すると手札が詰まってドローが止まり、理想 デッキでは greedy より弱くなる)"""
+    options = outcomes(state)
+    if heavy_turn(state):
+        for o in options:
+            if o.action[0] == 'drink': return o.action
+    return _greedy([o for o in options if o.name is not None])
+
+# 倍率の高いターンまで温存する候補のカード (RulePolicy の hold_wait の対象)
+HOLD_FOR_HEAVY = ("至高のエンタメ", "魅惑のパフォーマンス")
+
+# ルール表: 行動ごとの評価 = gain*獲得スコア + (conc*集中 + buff*好調ターン) * 残りターンの割合 + hp*体力の増分
+#   heavy_turn() でないターンでは、ドリンクから drink_wait、HOLD_FOR_HEAVY のカードから hold_wait を引く。
+#   評価が最大の行動を選び、それが end 未満ならターンを終える。
+#   既定値は 理想 デッキ (ドリンク2つ) で greedy に有意に勝つ組み合わせ。集中・好調の重みは正にすると弱くなる。
+DEFAULT_RULES = {'gain': 1.0, 'conc': 0.0, 'buff': 0.0, 'hp': 1.5, 'drink_wait': 200.0, 'hold_wait': 0.0, 'end': -50.0}
+# tune_rules() で動かす項目と1回の刻み (gain は評価の尺度なので固定)
+RULE_STEPS = {'conc': 2.0, 'buff': 1.0, 'hp': 1.0, 'drink_wait': 100.0, 'hold_wait': 50.0, 'end': 25.0}
+
+class RulePolicy:
+    """DEFAULT_RULES の形の重み表で行動を評価する方針。rules で一部だけ上書きできる"""
+    def __init__(self, rules=None):
+        unknown = set(rules or ()) - set(DEFAULT_RULES)
+        if unknown: raise ValueError(f"unknown rules: {', '.join(sorted(unknown))}")
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+
+    def value(self, state, o, heavy):
+        r = self.rules
+        left = (state.max_turns - state.turn + 1) / state.max_turns
+        v = r['gain'] * o.gain + (r['conc'] * o.conc + r['buff'] * o.buffs) * left + r['hp'] * o.hp
+        if not heavy:
+            if o.name is None: v -= r['drink_wait']
+            elif o.name in HOLD_FOR_HEAVY: v -= r['hold_wait']
+        return v
+
+    def __call__(self, state, rng):
+        options = outcomes(state)
+        if not options: return ('end',)
+        heavy = heavy_turn(state)
+        values = [self.value(state, o, heavy) for o in options]
+        i = max(range(len(options)), key=values.__getitem__)
+        return options[i].action if values[i] >= self.rules['end'] else ('end',)
+
+    def __repr__(self):
+        return f"RulePolicy({self.rules!r})"
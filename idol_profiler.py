@@ -0,0 +1,143 @@
+# 計測レイヤー (既定では無効。有効にしたときだけエンジンのメソッドを計測用のラッパーに差し替える)
+#   フェーズごとの呼び出し回数・合計時間・最大時間と、任意のカウンタを集計する。
+#   エンジン: GameState のターン進行・スコア計算・ドロー・シャッフル・効果、PItem.check
+#   UI: idol_game の section() で囲んだ部分 (各カラム・グリッド・円グラフ・画像読み込み)
+#   結果は snapshot() / to_json() で取り出し、バージョン間で比べられる形で保存する。
+#   python idol_profiler.py -n 200 --json profile.json
+#   プロセス全体で1つ (PROFILER) なので、Streamlit では全セッションの合計になる。
+import argparse
+import contextlib
+import functools
+import json
+import platform
+import threading
+import time
+
+PROFILE_VERSION = 1
+# (クラスの import 先, クラス名, メソッド名) -> 計測名 "engine.<クラス名>.<メソッド名>"
+ENGINE_HOOKS = (
+    ('idol_engine.state', 'GameState', ('start_turn', 'end_turn', 'play_card', 'use_drink', 'calculate_score',
+                                         'draw_cards', '_reshuffle', 'run_ops', 'check_condition')),
+    ('idol_engine.models', 'PItem', ('check',)),
+)
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}     # name -> [calls, total_s, max_s]
+        self.counters = {}
+        self.patched = []    # (owner, attr, original)
+        self.lock = threading.Lock()
+
+    # ---- 集計 ----
+    def add(self, name, elapsed):
+        with self.lock:
+            t = self.timers.get(name)
+            if t is None: self.timers[name] = [1, elapsed, elapsed]
+            else:
+                t[0] += 1; t[1] += elapsed
+                if elapsed > t[2]: t[2] = elapsed
+
+    def count(self, name, n=1):
+        if not self.enabled: return
+        with self.lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.add(name, time.perf_counter() - t0)
+
+    def section(self, name):
+        """with PROFILER.section("ui.xxx"): ... 。無効時は何もしない"""
+        return self._timed(name) if self.enabled else contextlib.nullcontext()
+
+    def reset(self):
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    # ---- 有効化 (メソッドの差し替え) ----
+    def wrap(self, owner, attr, name):
+        original = getattr(owner, attr)
+        add = self.add
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try: return original(*args, **kwargs)
+            finally: add(name, time.perf_counter() - t0)
+        setattr(owner, attr, timed)
+        self.patched.append((owner, attr, original))
+
+    def enable(self, hooks=ENGINE_HOOKS):
+        if self.enabled: return self
+        import importlib
+        for module, cls, methods in hooks:
+            owner = getattr(importlib.import_module(module), cls)
+            for m in methods: self.wrap(owner, m, f"engine.{cls}.{m}")
+        self.enabled = True
+        return self
+
+    def disable(self):
+        for owner, attr, original in reversed(self.patched): setattr(owner, attr, original)
+        self.patched = []
+        self.enabled = False
+        return self
+
+    # ---- 出力 ----
+    def snapshot(self):
+        with self.lock:
+            timers = {name: {'calls': c, 'total_ms': round(total * 1e3, 3), 'mean_us': round(total / c * 1e6, 2),
+                             'max_ms': round(mx * 1e3, 3)}
+                      for name, (c, total, mx) in sorted(self.timers.items())}
+            counters = dict(sorted(self.counters.items()))
+        return {'version': PROFILE_VERSION, 'python': platform.python_version(), 'created': time.time(),
+                'timers': timers, 'counters': counters}
+
+    def to_json(self, path=None):
+        text = json.dumps(self.snapshot(), ensure_ascii=False, indent=1)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f: f.write(text)
+        return text
+
+    def rows(self):
+        """表示用 [(name, calls, total_ms, mean_us, max_ms)] を合計時間の降順で"""
+        snap = self.snapshot()['timers']
+        rows = [(n, t['calls'], t['total_ms'], t['mean_us'], t['max_ms']) for n, t in snap.items()]
+        return sorted(rows, key=lambda r: r[2], reverse=True)
+
+PROFILER = Profiler()
+
+def format_rows(rows):
+    lines = [f"{'phase':<34}{'calls':>9}{'total ms':>11}{'mean us':>10}{'max ms':>9}"]
+    lines += [f"{n:<34}{c:>9,}{t:>11.1f}{m:>10.1f}{x:>9.2f}" for n, c, t, m, x in rows]
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GameState でゲームを回してフェーズごとの時間を計測する")
+    parser.add_argument('-n', '--games', type=int, default=200)
+    parser.add_argument('--deck', default="理想")
+    parser.add_argument('--drinks', nargs='*', default=[])
+    parser.add_argument('--policy', default='first')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="結果を書き出す JSON ファイル")
+    args = parser.parse_args(argv)
+
+    import random
+    from idol_engine import get_template_decks
+    from idol_sim import POLICIES, build_loadout, play_game
+    loadout = build_loadout(get_template_decks()[args.deck], 'shuki_kotone', (), args.drinks[:3])
+    policy, rng = POLICIES[args.policy], random.Random(args.seed)
+    PROFILER.enable()
+    try:
+        with PROFILER.section("sim.games"):
+            for _ in range(args.games): play_game(loadout, policy, rng)
+        PROFILER.count("sim.games", args.games)
+    finally:
+        PROFILER.disable()
+    print(format_rows(PROFILER.rows()))
+    if args.json: PROFILER.to_json(args.json)
+    return PROFILER.snapshot()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# リプレイ (1ゲーム分の記録) のバイナリ形式・再実行・ストリーム読み出し
+#   乱数のシード・デッキ・Pアイテム・ドリンク・行動列があれば、GameState は同じゲームを再現できる
+#   (undo で戻した手は行動列から取り除く。undo は乱数の状態も戻すので再現性は崩れない)。
+#
+#   ファイル = ヘッダ (MAGIC, 版, カタログ CRC32) + レコードの並び
+#   レコード = u16 本体の長さ + 本体
+#     本体 = u64 シード, u32 最終スコア, u8 キャラ, u8 枚数 + カードID列, u8 個数 + アイテムID列,
+#            u8 個数 + ドリンクID列, u16 手数 + 行動列 (すべてリトルエンディアン)
+#   ID は get_characters() / get_full_card_pool() / get_all_p_items() / get_all_drinks() の定義順。
+#   定義の並びが変わると ID の意味が変わるので、名前の並びの CRC32 をヘッダに入れて読み込み時に照合する。
+#   行動は1バイト: 上位4bit が種類 (0 ターン終了 / 1 カード / 2 ドリンク)、下位4bit が位置。
+#
+#   python idol_replay.py synth games.idr -n 100000     (シミュレーションでリプレイを作る)
+#   python idol_replay.py stats games.idr               (件数・平均スコアなど)
+#   python idol_replay.py verify games.idr              (再実行して記録スコアと照合)
+import argparse
+import collections
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from idol_engine import (
+    GameState, compile_loadout, FastGameState,
+    get_characters, get_full_card_pool, get_all_p_items, get_all_drinks,
+)
+
+MAGIC = b"IDRP"
+FORMAT_VERSION = 1
+_FILE_HEADER = struct.Struct("<4sBI")
+_RECORD_LEN = struct.Struct("<H")
+_RECORD_HEAD = struct.Struct("<QIBB")   # seed, score, キャラ, デッキ枚数
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+ACTION_END, ACTION_CARD, ACTION_DRINK = 0, 1, 2
+
+# deck / items / drinks / actions は bytes (ID や行動コードの列) のまま持つ
+Replay = collections.namedtuple('Replay', 'seed score char deck items drinks actions')
+
+# ==========================================
+# 1. ID の対応表
+# ==========================================
+class Catalog:
+    """定義名 <-> ID の対応。CRC は名前の並びから計算する"""
+    def __init__(self):
+        self.characters = get_characters()
+        self.cards = get_full_card_pool()
+        self.items = get_all_p_items()
+        self.drinks = get_all_drinks()
+        self.char_keys = list(self.characters)
+        # キャラ固有のカード・アイテムも ID を持たせる (プールに同名があればそちらと同じ扱い)
+        for char in self.characters.values():
+            if char.unique_card and char.unique_card.name not in self.cards: self.cards[char.unique_card.name] = char.unique_card
+            if char.unique_p_item and char.unique_p_item.name not in self.items: self.items[char.unique_p_item.name] = char.unique_p_item
+        self.card_names, self.item_names, self.drink_names = list(self.cards), list(self.items), list(self.drinks)
+        self.card_ids = {n: i for i, n in enumerate(self.card_names)}
+        self.item_ids = {n: i for i, n in enumerate(self.item_names)}
+        self.drink_ids = {n: i for i, n in enumerate(self.drink_names)}
+        self.char_ids = {k: i for i, k in enumerate(self.char_keys)}
+        text = "\x1e".join("\x1f".join(names) for names in (self.char_keys, self.card_names, self.item_names, self.drink_names))
+        self.crc = zlib.crc32(text.encode('utf-8'))
+
+    def loadout(self, replay):
+        """Replay -> (キャラ, デッキ, Pアイテム, ドリンク) の定義オブジェクト"""
+        return (self.characters[self.char_keys[replay.char]],
+                [self.cards[self.card_names[i]] for i in replay.deck],
+                [self.items[self.item_names[i]] for i in replay.items],
+                [self.drinks[self.drink_names[i]] for i in replay.drinks])
+
+_CATALOG = None
+
+def default_catalog():
+    global _CATALOG
+    if _CATALOG is None: _CATALOG = Catalog()
+    return _CATALOG
+
+# ==========================================
+# 2. 変換
+# ==========================================
+def encode_action(action):
+    if action[0] == 'card': return (ACTION_CARD << 4) | action[1]
+    if action[0] == 'drink': return (ACTION_DRINK << 4) | action[1]
+    return ACTION_END << 4
+
+def decode_action(code):
+    kind, pos = code >> 4, code & 0xF
+    if kind == ACTION_CARD: return ('card', pos)
+    if kind == ACTION_DRINK: return ('drink', pos)
+    return ('end',)
+_DECODED = [decode_action(c) for c in range(256)]
+
+def make_replay(seed, char_key, deck, p_items, drinks, actions, score=0, catalog=None):
+    """定義オブジェクトと行動のタプル列から Replay を作る (デッキ・アイテムの並びはそのまま保つ)"""
+    cat = catalog or default_catalog()
+    return Replay(seed, score, cat.char_ids[char_key],
+                  bytes(cat.card_ids[c.name] for c in deck),
+                  bytes(cat.item_ids[p.name] for p in p_items),
+                  bytes(cat.drink_ids[d.name] for d in drinks),
+                  bytes(encode_action(a) for a in actions))
+
+def pack(replay):
+    """Replay -> レコード (長さ付きの bytes)"""
+    body = b"".join((
+        _RECORD_HEAD.pack(replay.seed, replay.score, replay.char, len(replay.deck)), replay.deck,
+        _U8.pack(len(replay.items)), replay.items,
+        _U8.pack(len(replay.drinks)), replay.drinks,
+        _U16.pack(len(replay.actions)), replay.actions,
+    ))
+    return _RECORD_LEN.pack(len(body)) + body
+
+def unpack_from(buf, offset):
+    """buf[offset:] のレコードを読み、(Replay, 次のレコードの位置) を返す"""
+    (size,) = _RECORD_LEN.unpack_from(buf, offset)
+    p = offset + 2
+    end = p + size
+    seed, score, char, n = _RECORD_HEAD.unpack_from(buf, p)
+    p += _RECORD_HEAD.size
+    deck = bytes(buf[p:p + n]); p += n
+    n = buf[p]; items = bytes(buf[p + 1:p + 1 + n]); p += 1 + n
+    n = buf[p]; drinks = bytes(buf[p + 1:p + 1 + n]); p += 1 + n
+    (n,) = _U16.unpack_from(buf, p)
+    actions = bytes(buf[p + 2:p + 2 + n])
+    if p + 2 + n != end: raise ValueError(f"corrupt replay record at offset {offset}")
+    return Replay(seed, score, char, deck, items, drinks, actions), end
+
+# ==========================================
+# 3. ファイル入出力
+# ==========================================
+_WRITE_LOCK = threading.Lock()
+
+def _check_header(data, catalog, path):
+    magic, version, crc = _FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC: raise ValueError(f"{path}: not a replay file")
+    if version != FORMAT_VERSION: raise ValueError(f"{path}: unsupported replay version {version}")
+    if crc != catalog.crc: raise ValueError(f"{path}: card/item definitions changed since this file was written")
+
+class ReplayWriter:
+    """追記モードで開く。新しいファイルならヘッダを書き、既存ならヘッダを照合する"""
+    def __init__(self, path, catalog=None):
+        self.catalog = catalog or default_catalog()
+        self.path = path
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        self.f = open(path, 'ab+')
+        self.f.seek(0)
+        head = self.f.read(_FILE_HEADER.size)
+        if head: _check_header(head, self.catalog, path)
+        else: self.f.write(_FILE_HEADER.pack(MAGIC, FORMAT_VERSION, self.catalog.crc))
+
+    def write(self, replay):
+        self.f.write(pack(replay))
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def append_replay(path, replay, catalog=None):
+    """1件だけ追記する (Streamlit の複数セッションから呼ばれるのでロックする)"""
+    with _WRITE_LOCK, ReplayWriter(path, catalog) as w: w.write(replay)
+
+def iter_replays(path, catalog=None):
+    """ファイルのリプレイを先頭から1件ずつ返す。mmap で読むので巨大なファイルでも全体を読み込まない"""
+    cat = catalog or default_catalog()
+    if os.path.getsize(path) == 0: return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        _check_header(mm, cat, path)
+        offset, size = _FILE_HEADER.size, len(mm)
+        while offset < size:
+            replay, offset = unpack_from(mm, offset)
+            yield replay
+
+# ==========================================
+# 4. 再実行
+# ==========================================
+class ReplayEngine:
+    """リプレイを UI なしで再実行する。同じロードアウトのコンパイル結果は使い回す
+
+    verbose=True ならイベントを記録する GameState を使う (engine='object' のみ)。
+    """
+    def __init__(self, catalog=None, engine='fast', verbose=False):
+        if verbose and engine != 'object': raise ValueError("verbose replay requires engine='object'")
+        self.catalog = catalog or default_catalog()
+        self.engine = engine
+        self.verbose = verbose
+        self.compiled = {}
+
+    def state(self, replay):
+        loadout = self.catalog.loadout(replay)
+        rng = random.Random(replay.seed)
+        if self.engine == 'object':
+            char, deck, p_items, drinks = loadout
+            return GameState(char, deck, p_items, drinks=drinks, verbose=self.verbose, rng=rng)
+        key = (replay.char, replay.deck, replay.items, replay.drinks)
+        lo = self.compiled.get(key)
+        if lo is None: lo = self.compiled[key] = compile_loadout(loadout)
+        return FastGameState(lo, rng)
+
+    def run(self, replay):
+        """行動列を最後まで適用した状態を返す。適用できない手があれば ValueError"""
+        s = self.state(replay)
+        s.start_turn()
+        decoded = _DECODED
+        for i, code in enumerate(replay.actions):
+            if not s.apply_action(decoded[code]):
+                raise ValueError(f"illegal action {decoded[code]} at step {i}")
+        return s
+
+    def score(self, replay):
+        return self.run(replay).score
+
+def record_game(seed, char_key, loadout, policy, policy_rng, catalog=None):
+    """方針でゲームを1回プレイし、その Replay を返す (方針の乱数はゲームの乱数と分ける)"""
+    char, deck, p_items, drinks = loadout
+    s = GameState(char, deck, p_items, drinks=drinks, verbose=False, rng=random.Random(seed))
+    s.start_turn()
+    actions = []
+    while not s.is_game_over():
+        action = policy(s, policy_rng)
+        if not s.apply_action(action): action = ('end',); s.apply_action(action)
+        actions.append(action)
+    return make_replay(seed, char_key, deck, p_items, drinks, actions, s.score, catalog)
+
+# ==========================================
+# 5. CLI
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="リプレイファイルの作成・集計・照合")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('synth', help="シミュレーションでリプレイを作って追記する")
+    p.add_argument('path'); p.add_argument('-n', '--games', type=int, default=1000)
+    p.add_argument('--deck', default="理想"); p.add_argument('--policy', default='random')
+    p.add_argument('--drinks', nargs='*', default=[]); p.add_argument('--seed', type=int, default=0)
+    p = sub.add_parser('stats', help="件数・平均スコア・読み出し速度")
+    p.add_argument('path')
+    p = sub.add_parser('verify', help="再実行して記録スコアと照合する")
+    p.add_argument('path'); p.add_argument('--engine', choices=('fast', 'object'), default='fast')
+    p.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.cmd == 'synth':
+        from idol_engine import get_template_decks
+        from idol_sim import POLICIES, build_loadout
+        loadout = build_loadout(get_template_decks()[args.deck], 'shuki_kotone', (), args.drinks[:3])
+        policy, rng = POLICIES[args.policy], random.Random(args.seed)
+        with ReplayWriter(args.path) as w:
+            for _ in range(args.games):
+                w.write(record_game(rng.getrandbits(64), 'shuki_kotone', loadout, policy, rng))
+        print(f"wrote {args.games:,} replays to {args.path} ({time.perf_counter() - t0:.1f}s, {os.path.getsize(args.path):,} bytes)")
+    elif args.cmd == 'stats':
+        n = total = actions = 0
+        for r in iter_replays(args.path):
+            n += 1; total += r.score; actions += len(r.actions)
+        el = time.perf_counter() - t0
+        print(f"{n:,} replays, mean score {total / max(n, 1):,.0f}, {actions / max(n, 1):.1f} actions/game, "
+              f"{os.path.getsize(args.path) / max(n, 1):.0f} bytes/game, read {n / el:,.0f} replays/s")
+    else:
+        engine = ReplayEngine(engine=args.engine)
+        n = bad = 0
+        for r in iter_replays(args.path):
+            if args.limit is not None and n >= args.limit: break
+            n += 1
+            if engine.score(r) != r.score: bad += 1
+        el = time.perf_counter() - t0
+        print(f"{n:,} replays, {bad} mismatches, {n / el:,.0f} replays/s ({args.engine})")
+        return bad
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,146 @@
+# セッションごとの重い状態 (GameState・undo 用スナップショット・AI の探索木) の置き場
+#   Streamlit の session_state には軽いもの (選択内容・リプレイ = シード + 行動列) だけを置き、
+#   重いものはプロセスで1つのプール (POOL) に session_key ごとに持たせる。
+#   - 1セッションが予算 (session_budget) を超えたら shrink() で小さくする (undo を切り詰める・AI を捨てる)
+#   - 全体が予算 (budget) を超えたら最後に使われたのが古いセッションから追い出す
+#   - idle_seconds 以上使われていないセッションは追い出す
+#   追い出されたセッションは、次に使われたときにリプレイから作り直す (idol_game.rebuild_game)。
+#   予算は環境変数 IDOL_SESSION_BUDGET_MB / IDOL_SESSION_MB / IDOL_SESSION_IDLE (秒) で変えられる。
+import collections
+import os
+import sys
+import threading
+import time
+import types
+
+# 大きさの見積もりでたどらない型 (共有されている / 中身を持たない)
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+           str, bytes, int, float, bool, type(None))
+
+def deep_sizeof(obj, skip=frozenset()):
+    """obj からたどれるオブジェクトの合計バイト数 (sys.getsizeof の和)。id が skip に入っているものは数えない"""
+    seen = set(skip)
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        i = id(o)
+        if i in seen: continue
+        seen.add(i)
+        total += sys.getsizeof(o)
+        if isinstance(o, _OPAQUE): continue
+        if isinstance(o, dict):
+            stack.extend(o.keys()); stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(o)
+        else:
+            d = getattr(o, '__dict__', None)
+            if d is not None: stack.append(d)
+            for name in getattr(type(o), '__slots__', ()):
+                v = getattr(o, name, None)
+                if v is not None: stack.append(v)
+    return total
+
+def reachable_ids(*objs):
+    """objs からたどれる全オブジェクトの id (共有定義を見積もりから外すため)"""
+    seen = set()
+    stack = list(objs)
+    while stack:
+        o = stack.pop()
+        if id(o) in seen: continue
+        seen.add(id(o))
+        if isinstance(o, _OPAQUE): continue
+        if isinstance(o, dict): stack.extend(o.keys()); stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)): stack.extend(o)
+        elif hasattr(o, '__dict__'): stack.append(o.__dict__)
+    return frozenset(seen)
+
+class SessionPool:
+    """session_key -> 重い状態の dict。最近使った順に並べ、予算と放置時間で追い出す"""
+    def __init__(self, budget=1024 << 20, session_budget=16 << 20, idle_seconds=1800):
+        self.budget = budget
+        self.session_budget = session_budget
+        self.idle_seconds = idle_seconds
+        self.slots = collections.OrderedDict()  # key -> dict
+        self.meta = {}                          # key -> [最終使用時刻, 見積もりバイト数]
+        self.shared = frozenset()
+        self.evictions = collections.Counter()  # 理由 -> 回数
+        self.lock = threading.RLock()
+
+    def share(self, *objs):
+        """全セッションで共有している定義を登録する (大きさの見積もりに含めない)"""
+        with self.lock: self.shared = self.shared | reachable_ids(*objs)
+
+    def get(self, key):
+        """スロット (dict) を返す。追い出されていれば None"""
+        with self.lock:
+            slot = self.slots.get(key)
+            if slot is not None:
+                self.slots.move_to_end(key)
+                self.meta[key][0] = time.time()
+            return slot
+
+    def put(self, key, **values):
+        with self.lock:
+            self.slots[key] = slot = dict(values)
+            self.slots.move_to_end(key)
+            self.meta[key] = [time.time(), 0]
+            return slot
+
+    def drop(self, key):
+        with self.lock:
+            self.slots.pop(key, None)
+            self.meta.pop(key, None)
+
+    def sizeof(self, obj):
+        return deep_sizeof(obj, self.shared)
+
+    def measure(self, key, shrink=None, estimate=None):
+        """key のスロットの大きさを estimate(slot) (既定は deep_sizeof) で見積もり直す。
+        1セッションの予算を超えていれば shrink(slot) で小さくする。
+        その後、全体の予算と放置時間で他のセッションを追い出す (key 自身は追い出さない)"""
+        estimate = estimate or self.sizeof
+        with self.lock:
+            slot = self.slots.get(key)
+            if slot is None: return 0
+            size = estimate(slot)
+            if size > self.session_budget and shrink is not None:
+                shrink(slot)
+                self.evictions['shrink'] += 1
+                size = estimate(slot)
+            self.meta[key][1] = size
+            self.enforce(keep=key)
+            return size
+
+    def enforce(self, keep=None, now=None):
+        """放置されたセッションと、予算を超えた分の古いセッションを追い出す。追い出した数を返す"""
+        now = time.time() if now is None else now
+        evicted = 0
+        with self.lock:
+            for key in [k for k, (seen, _) in self.meta.items() if k != keep and now - seen > self.idle_seconds]:
+                self.drop(key); self.evictions['idle'] += 1; evicted += 1
+            total = self.total_bytes()
+            for key in list(self.slots):
+                if total <= self.budget: break
+                if key == keep: continue
+                total -= self.meta[key][1]
+                self.drop(key); self.evictions['budget'] += 1; evicted += 1
+        return evicted
+
+    def total_bytes(self):
+        with self.lock: return sum(size for _, size in self.meta.values())
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = [{'session': key[:8], 'bytes': size, 'idle_s': round(now - seen, 1)}
+                    for key, (seen, size) in self.meta.items()]
+            total = self.total_bytes()
+            return {'sessions': len(rows), 'total_bytes': total,
+                    'mean_bytes': total / len(rows) if rows else 0.0,
+                    'budget': self.budget, 'session_budget': self.session_budget,
+                    'idle_seconds': self.idle_seconds, 'evictions': dict(self.evictions), 'rows': rows}
+
+POOL = SessionPool(budget=int(float(os.environ.get("IDOL_SESSION_BUDGET_MB", 1024)) * (1 << 20)),
+                   session_budget=int(float(os.environ.get("IDOL_SESSION_MB", 16)) * (1 << 20)),
+                   idle_seconds=float(os.environ.get("IDOL_SESSION_IDLE", 1800)))
@@ -0,0 +1,352 @@
+# ヘッドレス・モンテカルロシミュレータ (Streamlit / matplotlib は import しない)
+#   python idol_sim.py -n 10000 --deck 理想 --drinks センブリソーダ ブーストエキス
+import argparse
+import json
+import math
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from idol_engine import (
+    GameState, get_full_card_pool, get_all_p_items, get_all_drinks,
+    get_characters, get_template_decks, get_rank, enumerate_turn_schedules,
+)
+from idol_engine.fast import FastGameState, compile_loadout
+from idol_policies import RulePolicy, concentration_policy, greedy_policy, timing_policy
+
+# ==========================================
+# 1. デッキ構築 (start_game と同じ手順)
+# ==========================================
+def build_loadout(deck_list, char_key='shuki_kotone', item_names=(), drink_names=()):
+    """(キャラ, デッキ, Pアイテム, ドリンク) を返す"""
+    card_pool = get_full_card_pool()
+    all_items = get_all_p_items()
+    all_drinks = get_all_drinks()
+    char = get_characters()[char_key]
+
+    deck = []
+    for card_name, count in deck_list.items():
+        card = card_pool.get(card_name)
+        if card:
+            deck.extend([card] * count)
+    if char.unique_card:
+        deck.append(char.unique_card)
+
+    p_items = []
+    if char.unique_p_item:
+        p_items.append(char.unique_p_item)
+    for item_name in item_names:
+        item = all_items.get(item_name)
+        if item and item.name != char.unique_p_item.name:
+            p_items.append(item)
+
+    drinks = [all_drinks[name] for name in drink_names if name in all_drinks]
+    return char, deck, p_items, drinks
+
+# ==========================================
+# 2. プレイ方針 (policy(state, rng) -> action)
+# ==========================================
+def random_policy(state, rng):
+    """合法手から一様ランダムに選ぶ"""
+    return rng.choice(state.legal_actions())
+
+def first_playable_policy(state, rng):
+    """左から使えるカードを使う。ドリンクは最大倍率のターンに使う"""
+    actions = state.legal_actions()
+    top_weight = max(t['weight'] for t in state.turn_info)
+    if state.turn_info[state.turn-1]['weight'] == top_weight:
+        for a in actions:
+            if a[0] == 'drink': return a
+    return actions[0]
+
+def fast_first_playable_policy(state, rng):
+    """first_playable_policy と同じ手を選ぶ FastGameState 用の版 (合法手リストを作らない)"""
+    if state.drinks and state.weights[state.turn-1] == state.top_weight: return ('drink', 0)
+    if state.actions_remaining > 0:
+        can_use = state.lo.can_use
+        for i, cid in enumerate(state.hand):
+            if can_use[cid](state): return ('card', i)
+    if state.drinks: return ('drink', 0)
+    return ('end',)
+
+# 方針の登録表 (--policy・idol_optimizer・分析ページ・idol_tournament はすべてここの名前で引く)
+#   greedy 以降は1手先読みする方針 (idol_policies)
+POLICIES = {
+    'random': random_policy,
+    'first': first_playable_policy,
+    'greedy': greedy_policy,
+    'conc': concentration_policy,
+    'timing': timing_policy,
+    'rules': RulePolicy(),
+}
+# FastGameState 用。first だけ専用の版があり、他は legal_actions() と snapshot / restore だけを使うのでそのまま使える
+FAST_POLICIES = dict(POLICIES, first=fast_first_playable_policy)
+ENGINES = ('fast', 'object', 'batch')
+
+# ==========================================
+# 3. 実行
+# ==========================================
+MAX_ACTIONS_PER_GAME = 1000
+
+def play_game(loadout, policy, rng, turn_info=None):
+    """1ゲームを最後まで進めて最終スコアを返す"""
+    char, deck, p_items, drinks = loadout
+    state = GameState(char, deck, p_items, drinks=drinks, verbose=False, rng=rng, turn_info=turn_info)
+    state.start_turn()
+    for _ in range(MAX_ACTIONS_PER_GAME):
+        if state.is_game_over(): break
+        action = policy(state, rng)
+        if not state.apply_action(action):
+            # 不正な手は方針のバグだが、ターン終了扱いで先へ進める
+            state.apply_action(('end',))
+    return state.score
+
+def play_fast_game(compiled, policy, rng, turn_info=None):
+    """play_game の FastGameState 版。同じ rng・同じ方針なら同じスコアを返す"""
+    state = FastGameState(compiled, rng, turn_info)
+    state.start_turn()
+    for _ in range(MAX_ACTIONS_PER_GAME):
+        if state.turn > state.max_turns: break
+        if not state.apply_action(policy(state, rng)): state.apply_action(('end',))
+    return state.score
+
+def game_runner(loadout, policy_name, engine='fast'):
+    """(rng, turn_info=None) -> 最終スコア を返す関数"""
+    if engine == 'fast':
+        compiled, policy = compile_loadout(loadout), FAST_POLICIES[policy_name]
+        return lambda rng, turn_info=None: play_fast_game(compiled, policy, rng, turn_info)
+    policy = POLICIES[policy_name]
+    return lambda rng, turn_info=None: play_game(loadout, policy, rng, turn_info)
+
+def batch_rng(rng):
+    """random.Random から numpy の Generator を派生させる (batch エンジン用)"""
+    import numpy as np
+    return np.random.default_rng(rng.getrandbits(64))
+
+def run_batch_games(loadout, policy_name, n_games, rng, turn_info=None):
+    """batch エンジンで n_games 回実行する。ゲーム単位の乱数は他エンジンと一致しない (分布は一致する)"""
+    from idol_engine.batch import compile_batch_loadout, run_batch
+    if n_games <= 0: return []
+    scores = run_batch(compile_batch_loadout(loadout), n_games, batch_rng(rng), policy_name, turn_info=turn_info)
+    return scores.tolist()
+
+def check_parity(deck_list, n_games, seed=0, char_key='shuki_kotone', item_names=(), drink_names=(), policy_name='first'):
+    """GameState と FastGameState を同じ乱数で n_games 回ずつ動かし、スコアが食い違ったゲームの
+    [(ゲーム番号, GameState のスコア, FastGameState のスコア)] を返す (空なら一致)"""
+    loadout = build_loadout(deck_list, char_key, item_names, drink_names)
+    slow, fast = game_runner(loadout, policy_name, 'object'), game_runner(loadout, policy_name, 'fast')
+    mismatches = []
+    for i in range(n_games):
+        a = slow(random.Random(f"{seed}/{i}"))
+        b = fast(random.Random(f"{seed}/{i}"))
+        if a != b: mismatches.append((i, a, b))
+    return mismatches
+
+# ==========================================
+# 4. 並列実行 (ワーカーごとに独立した乱数ストリーム)
+# ==========================================
+def worker_rng(seed, worker_idx):
+    # 文字列シードは SHA-512 で展開されるので、(seed, worker) ごとに独立なストリームになる
+    return random.Random(f"{seed}/{worker_idx}")
+
+def split_games(n_games, workers):
+    base, extra = divmod(n_games, workers)
+    return [base + (1 if i < extra else 0) for i in range(workers)]
+
+def _run_worker(job):
+    # ジョブは名前だけの小さなタプルにして、定義はワーカー側で組み立てる
+    deck_list, char_key, item_names, drink_names, policy_name, n_games, seed, worker_idx, engine = job
+    loadout = build_loadout(deck_list, char_key, item_names, drink_names)
+    rng = worker_rng(seed, worker_idx)
+    if engine == 'batch': return run_batch_games(loadout, policy_name, n_games, rng)
+    play = game_runner(loadout, policy_name, engine)
+    return [play(rng) for _ in range(n_games)]
+
+def run_parallel(deck_list, n_games, seed, workers=None, char_key='shuki_kotone',
+                 item_names=(), drink_names=(), policy_name='first', engine='fast'):
+    """n_games をワーカーに分割して実行する。結果は (seed, workers) が同じなら常に同一
+    (fast と object は同じ結果になる。batch は乱数の使い方が違うので分布だけが一致する)"""
+    workers = workers or os.cpu_count() or 1
+    jobs = [(deck_list, char_key, tuple(item_names), tuple(drink_names), policy_name, n, seed, i, engine)
+            for i, n in enumerate(split_games(n_games, workers))]
+    if workers == 1:
+        return _run_worker(jobs[0])
+    scores = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map はジョブ順に結果を返すので、連結順もワーカー番号順で固定される
+        for chunk in pool.map(_run_worker, jobs):
+            scores.extend(chunk)
+    return scores
+
+# ==========================================
+# 5. スケジュール全列挙による期待値
+# ==========================================
+class ScheduleCache:
+    """(デッキ, アイテム, ドリンク, 方針, シード, スケジュール) -> スコア列 のキャッシュ"""
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f: self.entries = pickle.load(f)
+
+    def save(self):
+        if self.path:
+            with open(self.path, 'wb') as f: pickle.dump(self.entries, f)
+
+def _schedule_key(deck_list, char_key, item_names, drink_names, policy_name, seed, schedule, engine='fast'):
+    deck = tuple(sorted((n, c) for n, c in deck_list.items() if c > 0))
+    genres = tuple(t['genre'] for t in schedule)
+    key = (deck, char_key, tuple(item_names), tuple(drink_names), policy_name, str(seed), genres)
+    # fast と object は同じスコア列になるのでキーを共有し、batch だけ分ける
+    return key + ('batch',) if engine == 'batch' else key
+
+def _run_schedule_worker(job):
+    deck_list, char_key, item_names, drink_names, policy_name, tasks, engine = job
+    loadout = build_loadout(deck_list, char_key, item_names, drink_names)
+    schedules = enumerate_turn_schedules(loadout[0].genres)
+    play = game_runner(loadout, policy_name, engine) if engine != 'batch' else None
+    results = []
+    for idx, start, count, seed in tasks:
+        # 乱数ストリームは (seed, スケジュール, 開始位置) だけで決まるので、ワーカー数によらず同じ結果になる
+        rng = random.Random(f"{seed}/s{idx}/{start}")
+        if play is None: results.append(run_batch_games(loadout, policy_name, count, rng, schedules[idx][0]))
+        else: results.append([play(rng, schedules[idx][0]) for _ in range(count)])
+    return results
+
+def run_exact(deck_list, games_per_schedule, seed, workers=1, char_key='shuki_kotone',
+              item_names=(), drink_names=(), policy_name='first', cache=None, engine='fast'):
+    """全スケジュールで games_per_schedule 回ずつ実行し [(turn_info, weight, scores)] を返す"""
+    item_names, drink_names = tuple(item_names), tuple(drink_names)
+    schedules = enumerate_turn_schedules(get_characters()[char_key].genres)
+    cache = cache if cache is not None else ScheduleCache()
+    keys = [_schedule_key(deck_list, char_key, item_names, drink_names, policy_name, seed, sch, engine)
+            for sch, _ in schedules]
+    tasks = []
+    for idx, key in enumerate(keys):
+        have = cache.entries.setdefault(key, [])
+        if len(have) >= games_per_schedule: cache.hits += 1
+        else:
+            cache.misses += 1
+            tasks.append((idx, len(have), games_per_schedule - len(have), seed))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    jobs = [(deck_list, char_key, item_names, drink_names, policy_name, tasks[i::workers], engine) for i in range(workers)]
+    if workers == 1:
+        chunks = [_run_schedule_worker(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_run_schedule_worker, jobs))
+    for job, chunk in zip(jobs, chunks):
+        for (idx, _, _, _), scores in zip(job[5], chunk):
+            cache.entries[keys[idx]].extend(scores)
+
+    return [(sch, w, cache.entries[key][:games_per_schedule]) for (sch, w), key in zip(schedules, keys)]
+
+def summarize_exact(results, elapsed):
+    """スケジュールの確率で重み付けした期待値と標準誤差"""
+    pooled = [x for _, _, scores in results for x in scores]
+    summary = summarize(pooled, elapsed)
+    mean = 0.0; var_of_mean = 0.0
+    for _, w, scores in results:
+        m = sum(scores) / len(scores)
+        mean += w * m
+        if len(scores) > 1:
+            var = sum((x - m) ** 2 for x in scores) / (len(scores) - 1)
+            var_of_mean += w * w * var / len(scores)
+    summary.update(mean=mean, std_err=math.sqrt(var_of_mean), rank_mean=get_rank(mean), schedules=len(results))
+    return summary
+
+def _percentile(sorted_scores, q):
+    if not sorted_scores: return 0
+    pos = (len(sorted_scores) - 1) * q / 100
+    lo = math.floor(pos); hi = math.ceil(pos)
+    return sorted_scores[lo] + (sorted_scores[hi] - sorted_scores[lo]) * (pos - lo)
+
+def summarize(scores, elapsed):
+    scores = sorted(scores)
+    n = len(scores)
+    mean = sum(scores) / n if n else 0.0
+    var = sum((x - mean) ** 2 for x in scores) / (n - 1) if n > 1 else 0.0
+    pct = {f"p{q}": _percentile(scores, q) for q in (5, 25, 50, 75, 95)}
+    return {
+        'games': n,
+        'mean': mean,
+        'std': math.sqrt(var),
+        'min': scores[0] if n else 0,
+        'max': scores[-1] if n else 0,
+        **pct,
+        'rank_mean': get_rank(mean),
+        'rank_p50': get_rank(pct['p50']),
+        'seconds': elapsed,
+        'games_per_sec': n / elapsed if elapsed > 0 else float('inf'),
+    }
+
+def format_summary(summary):
+    lines = [
+        f"games      : {summary['games']:,}",
+        f"mean ± std : {summary['mean']:,.1f} ± {summary['std']:,.1f}",
+        f"min / max  : {summary['min']:,} / {summary['max']:,}",
+        "percentiles: " + "  ".join(f"{k}={summary[k]:,.0f}" for k in ('p5', 'p25', 'p50', 'p75', 'p95')),
+        f"rank       : mean={summary['rank_mean']:,}  p50={summary['rank_p50']:,}",
+        f"speed      : {summary['games_per_sec']:,.0f} games/s ({summary['seconds']:.2f}s)",
+    ]
+    if 'std_err' in summary:
+        lines.append(f"exact      : {summary['schedules']} schedules, std err of mean {summary['std_err']:,.1f}")
+    if 'seed' in summary:
+        lines.append(f"seed       : {summary['seed']} (workers={summary['workers']})")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="デッキの得点分布をヘッドレスで計測する")
+    parser.add_argument('-n', '--games', type=int, default=1000, help="試行回数")
+    parser.add_argument('--deck', default="理想", help="get_template_decks() のテンプレ名")
+    parser.add_argument('--char', default='shuki_kotone', help="get_characters() のキー")
+    parser.add_argument('--items', nargs='*', default=[], help="追加Pアイテム名")
+    parser.add_argument('--drinks', nargs='*', default=[], help="ドリンク名 (最大3つ)")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='first')
+    parser.add_argument('--seed', type=int, default=None, help="未指定ならランダムに決めて表示する")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="プロセス数 (0 で全コア)")
+    parser.add_argument('--exact-schedules', action='store_true',
+                        help="全280スケジュールを列挙し、確率で重み付けした厳密な期待値を出す (-n は合計試行数)")
+    parser.add_argument('--cache', default=None, help="--exact-schedules の結果キャッシュ (pickle ファイル)")
+    parser.add_argument('--engine', choices=ENGINES, default='fast',
+                        help="fast: 配列ベースの FastGameState / object: GameState (結果は同じ) / "
+                             "batch: NumPy で全ゲームを同時に進める (分布は同じ。方針は first / random のみ。numpy が必要)")
+    parser.add_argument('--json', action='store_true', help="結果を JSON で出力")
+    args = parser.parse_args(argv)
+
+    templates = get_template_decks()
+    if args.deck not in templates:
+        parser.error(f"unknown deck '{args.deck}' (choices: {', '.join(templates)})")
+    if args.engine == 'batch':
+        from idol_engine.batch import BATCH_POLICIES
+        if args.policy not in BATCH_POLICIES:
+            parser.error(f"--engine batch does not support policy '{args.policy}' (choices: {', '.join(BATCH_POLICIES)})")
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    t0 = time.perf_counter()
+    if args.exact_schedules:
+        cache = ScheduleCache(args.cache)
+        n_schedules = len(enumerate_turn_schedules(get_characters()[args.char].genres))
+        per_schedule = max(1, math.ceil(args.games / n_schedules))
+        results = run_exact(templates[args.deck], per_schedule, seed, workers, args.char,
+                            args.items, args.drinks[:3], args.policy, cache, args.engine)
+        cache.save()
+        summary = summarize_exact(results, time.perf_counter() - t0)
+    else:
+        scores = run_parallel(templates[args.deck], args.games, seed, workers, args.char,
+                              args.items, args.drinks[:3], args.policy, args.engine)
+        summary = summarize(scores, time.perf_counter() - t0)
+    summary.update(seed=seed, workers=workers)
+
+    if args.json: print(json.dumps(summary, ensure_ascii=False))
+    else: print(format_summary(summary))
+    return summary
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# 共通乱数 (CRN) での方針トーナメントとルール表の調整
+#   トーナメントは全方針に同じシード列でゲームをさせ、ゲームごとのスコア差で対比較する。
+#   差がはっきりした組から打ち切るので、決着に必要な分しかゲームを回さない。
+#   方針は idol_sim.POLICIES の名前で指定し、FastGameState で回す (GameState と同じスコアになる)。
+#   python idol_tournament.py tournament --deck 理想 --policies random first greedy conc timing rules -j 4
+#   python idol_tournament.py tune --deck 理想 --games 400
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from idol_engine import get_template_decks
+from idol_engine.fast import compile_loadout
+from idol_policies import DEFAULT_RULES, RULE_STEPS, RulePolicy
+from idol_sim import FAST_POLICIES, POLICIES, build_loadout, play_fast_game
+
+# ==========================================
+# 1. 方針の指定
+# ==========================================
+def make_policy(spec):
+    """方針名 (idol_sim.POLICIES のキー) か ('rules', {重み}) から FastGameState 用の方針を作る
+    (プロセス間では spec の形で渡す)"""
+    if isinstance(spec, str):
+        if spec not in FAST_POLICIES: raise ValueError(f"unknown policy: {spec}")
+        return FAST_POLICIES[spec]
+    name, params = spec
+    if name != 'rules': raise ValueError(f"unknown policy: {name}")
+    return RulePolicy(params)
+
+# ==========================================
+# 2. 共通乱数での対戦
+# ==========================================
+def play_seeded(compiled, policy, seed, index):
+    """index 番目のゲームの最終スコア。ゲームの乱数は (seed, index) だけで決まり、方針によらず同じ列から始まる"""
+    game_rng = random.Random(f"{seed}/g{index}")
+    policy_rng = random.Random(f"{seed}/p{index}")
+    return play_fast_game(compiled, lambda state, _: policy(state, policy_rng), game_rng)
+
+def _play_chunk(job):
+    deck_list, char_key, item_names, drink_names, spec, seed, start, count = job
+    compiled = compile_loadout(build_loadout(deck_list, char_key, item_names, drink_names))
+    policy = make_policy(spec)
+    return [play_seeded(compiled, policy, seed, i) for i in range(start, start + count)]
+
+def paired(a, b):
+    """先頭から揃えた同じシードのスコア差 a-b の (ゲーム数, 平均差, 標準誤差, z, 両側 p, CRN の分散比)
+    分散比は独立に回した場合の差の分散 / 実際の差の分散 (同じ精度に必要なゲーム数が何分の1になったか)"""
+    n = min(len(a), len(b))
+    if n < 2: return n, 0.0, float('inf'), 0.0, 1.0, 1.0
+    d = [x - y for x, y in zip(a[:n], b[:n])]
+    mean = sum(d) / n
+    var = statistics.variance(d, mean)
+    se = math.sqrt(var / n)
+    indep = statistics.variance(a[:n]) + statistics.variance(b[:n])
+    if se == 0: z = 0.0 if mean == 0 else math.copysign(float('inf'), mean)
+    else: z = mean / se
+    p = math.erfc(abs(z) / math.sqrt(2))
+    return n, mean, se, z, p, (indep / var if var > 0 else float('inf'))
+
+def run_tournament(deck_list, policies, seed=0, char_key='shuki_kotone', item_names=(), drink_names=(),
+                   alpha=0.05, min_games=200, batch=200, max_games=5000, workers=1, progress=None):
+    """policies = {表示名: spec}。全方針を同じシード列で回し、対ごとのスコア差を逐次検定する。
+
+    min_games 回の後、batch 回ごとに未決着の対を検定し、決着した対だけになった方針は打ち切る。
+    途中で何度も検定するぶんの有意水準の膨らみは、alpha を (対の数 x 最大検定回数) で割って抑える
+    (Bonferroni。保守的なので、ここで有意と出た差は全体で alpha 以下の誤りに収まる)。
+    """
+    names = list(policies)
+    if len(names) < 2: raise ValueError("need at least two policies")
+    if min_games < 2 or batch < 1 or max_games < min_games: raise ValueError("invalid game counts")
+    pairs = list(itertools.combinations(names, 2))
+    looks = 1 + math.ceil((max_games - min_games) / batch)
+    z_crit = statistics.NormalDist().inv_cdf(1 - alpha / (2 * len(pairs) * looks))
+    scores = {name: [] for name in names}
+    decided = {}   # (a, b) -> 勝った方 (全ゲームで同じスコアなら None。同じ手を選んでいて、回しても差は出ない)
+    item_names, drink_names = tuple(item_names), tuple(drink_names)
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    t0 = time.perf_counter()
+    try:
+        target = min_games
+        while True:
+            active = [n for n in names if any(p not in decided and n in p for p in pairs)]
+            jobs, owners = [], []
+            for name in active:
+                have = len(scores[name])
+                if have >= target: continue
+                step = math.ceil((target - have) / workers)
+                for start in range(have, target, step):
+                    jobs.append((deck_list, char_key, item_names, drink_names, policies[name], seed, start, min(step, target - start)))
+                    owners.append(name)
+            chunks = pool.map(_play_chunk, jobs) if pool else map(_play_chunk, jobs)
+            for name, chunk in zip(owners, chunks): scores[name].extend(chunk)
+            for p in pairs:
+                if p in decided: continue
+                _, mean, se, z = paired(scores[p[0]], scores[p[1]])[:4]
+                if abs(z) >= z_crit: decided[p] = p[0] if z > 0 else p[1]
+                elif se == 0: decided[p] = None
+            if progress: progress(sum(len(s) for s in scores.values()), len(decided), len(pairs))
+            if len(decided) == len(pairs) or target >= max_games: break
+            target = min(max_games, target + batch)
+    finally:
+        if pool: pool.shutdown()
+
+    summary = {}
+    for name in names:
+        s = scores[name]
+        summary[name] = {'games': len(s), 'mean': sum(s) / len(s), 'std_err': math.sqrt(statistics.variance(s) / len(s))}
+    results = []
+    for a, b in pairs:
+        n, mean, se, z, p, ratio = paired(scores[a], scores[b])
+        results.append({'a': a, 'b': b, 'games': n, 'diff': mean, 'std_err': se, 'z': z, 'p': p,
+                        'crn_gain': ratio, 'winner': decided.get((a, b)),
+                        'significant': decided.get((a, b)) is not None, 'same': (a, b) in decided and decided[(a, b)] is None})
+    total = sum(len(s) for s in scores.values())
+    return {'policies': summary, 'pairs': results, 'games': total, 'z_crit': z_crit, 'alpha': alpha,
+            'seed': seed, 'seconds': time.perf_counter() - t0}
+
+def format_tournament(result):
+    lines = [f"{'policy':<10}{'games':>8}{'mean':>11}{'± se':>9}"]
+    for name, s in sorted(result['policies'].items(), key=lambda kv: -kv[1]['mean']):
+        lines.append(f"{name:<10}{s['games']:>8,}{s['mean']:>11,.1f}{s['std_err']:>9,.1f}")
+    lines.append("")
+    lines.append(f"{'pair':<20}{'games':>7}{'diff':>10}{'± se':>8}{'z':>8}{'CRN':>7}  result")
+    for r in result['pairs']:
+        verdict = f"{r['winner']} wins" if r['significant'] else "same" if r['same'] else "n.s."
+        lines.append(f"{r['a'] + ' - ' + r['b']:<20}{r['games']:>7,}{r['diff']:>10,.1f}{r['std_err']:>8,.1f}"
+                     f"{r['z']:>8.2f}{r['crn_gain']:>6.1f}x  {verdict}")
+    lines.append(f"games: {result['games']:,} total ({result['seconds']:.1f}s), |z| >= {result['z_crit']:.2f} "
+                 f"for family-wise alpha {result['alpha']}, seed {result['seed']}")
+    lines.append("CRN = (独立に回した場合の差の分散) / (同じシードでの差の分散)")
+    return "\n".join(lines)
+
+# ==========================================
+# 3. ルール表の調整
+# ==========================================
+def tune_rules(deck_list, rules=None, seed=0, rounds=2, games=400, workers=1, log=None, **loadout):
+    """RULE_STEPS の項目を1つずつ ±刻み 動かし、今の表に有意に勝つ候補があれば採用する (座標降下)。
+    比較は run_tournament と同じ CRN の逐次検定 (最大 games 回)。ラウンドごとにシードを変える"""
+    best = dict(DEFAULT_RULES, **(rules or {}))
+    for rnd in range(rounds):
+        changed = False
+        for key, step in RULE_STEPS.items():
+            for sign in (1, -1):
+                cand = dict(best, **{key: best[key] + sign * step})
+                result = run_tournament(deck_list, {'current': ('rules', best), 'candidate': ('rules', cand)},
+                                        seed=f"{seed}/tune{rnd}", min_games=min(100, games), batch=100,
+                                        max_games=games, workers=workers, **loadout)
+                pair = result['pairs'][0]
+                if log: log(f"round {rnd} {key}={cand[key]:g}: diff {-pair['diff']:+,.1f} ± {pair['std_err']:,.1f}"
+                            f" ({pair['games']} games){' -> adopt' if pair['winner'] == 'candidate' else ''}")
+                if pair['winner'] == 'candidate':
+                    best, changed = cand, True
+                    break
+        if not changed: break
+    return best
+
+# ==========================================
+# 4. CLI
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="方針トーナメント (共通乱数・逐次検定) とルール表の調整")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    for cmd, help in (('tournament', "方針どうしを同じシード列で比べる"), ('tune', "ルール表の重みを調整する")):
+        p = sub.add_parser(cmd, help=help)
+        p.add_argument('--deck', default="理想")
+        p.add_argument('--char', default='shuki_kotone')
+        p.add_argument('--items', nargs='*', default=[])
+        p.add_argument('--drinks', nargs='*', default=[])
+        p.add_argument('--seed', type=int, default=0)
+        p.add_argument('-j', '--workers', type=int, default=1, help="プロセス数 (0 で全コア)")
+        p.add_argument('--rules', default=None, help="rules 方針の重み (JSON。DEFAULT_RULES の一部を上書き)")
+        p.add_argument('--json', action='store_true')
+        if cmd == 'tournament':
+            p.add_argument('--policies', nargs='+', default=sorted(POLICIES))
+            p.add_argument('--alpha', type=float, default=0.05)
+            p.add_argument('--min-games', type=int, default=200)
+            p.add_argument('--batch', type=int, default=200)
+            p.add_argument('--max-games', type=int, default=5000)
+        else:
+            p.add_argument('--games', type=int, default=400, help="1候補あたりの最大ゲーム数")
+            p.add_argument('--rounds', type=int, default=2)
+    args = parser.parse_args(argv)
+
+    templates = get_template_decks()
+    if args.deck not in templates: parser.error(f"unknown deck '{args.deck}' (choices: {', '.join(templates)})")
+    rules = json.loads(args.rules) if args.rules else None
+    loadout = dict(char_key=args.char, item_names=args.items, drink_names=args.drinks[:3])
+
+    if args.cmd == 'tune':
+        best = tune_rules(templates[args.deck], rules, args.seed, args.rounds, args.games, args.workers,
+                          log=None if args.json else print, **loadout)
+        print(json.dumps(best, ensure_ascii=False))
+        return best
+
+    unknown = [n for n in args.policies if n not in POLICIES]
+    if unknown: parser.error(f"unknown policies: {', '.join(unknown)} (choices: {', '.join(sorted(POLICIES))})")
+    policies = {n: ('rules', rules) if n == 'rules' and rules else n for n in args.policies}
+    result = run_tournament(templates[args.deck], policies, args.seed, alpha=args.alpha, min_games=args.min_games,
+                            batch=args.batch, max_games=args.max_games, workers=args.workers, **loadout)
+    print(json.dumps(result, ensure_ascii=False) if args.json else format_tournament(result))
+    return result
+
+if __name__ == "__main__":
+    main()
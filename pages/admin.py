@@ -0,0 +1,76 @@
+# 管理ページ: セッションプール (idol_sessions.POOL) の状態と計測 (idol_profiler.PROFILER) を表示する
+#   POOL・PROFILER はプロセスで1つなので、このサーバーで動いている全セッションが見える。
+#   他のセッションを追い出したり、全セッションの計測を切り替えたりできるので、環境変数 IDOL_ADMIN_TOKEN を設定し、同じトークンを入力したときだけ表示する
+#   (未設定ならページごと無効)。
+import hmac
+import os
+import sys
+
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idol_profiler import PROFILER
+from idol_sessions import POOL
+
+MB = 1 << 20
+
+def show_pool():
+    stats = POOL.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("セッション数", f"{stats['sessions']:,}")
+    c2.metric("合計", f"{stats['total_bytes'] / MB:,.1f} MB", help=f"予算 {stats['budget'] / MB:,.0f} MB")
+    c3.metric("1セッションあたり", f"{stats['mean_bytes'] / 1024:,.0f} KB", help=f"上限 {stats['session_budget'] / MB:,.0f} MB")
+    c4.metric("放置で追い出すまで", f"{stats['idle_seconds'] / 60:,.0f} 分")
+    st.progress(min(stats['total_bytes'] / stats['budget'], 1.0) if stats['budget'] else 0.0, text="予算の使用率")
+
+    ev = stats['evictions']
+    st.caption(f"追い出し: 放置 {ev.get('idle', 0):,} / 予算超過 {ev.get('budget', 0):,} / 縮小 {ev.get('shrink', 0):,}"
+               " (追い出されたセッションは次の操作でリプレイから作り直される)")
+    if stats['rows']:
+        rows = sorted(stats['rows'], key=lambda r: r['bytes'], reverse=True)
+        st.dataframe([{'session': r['session'], 'KB': round(r['bytes'] / 1024, 1), 'idle s': r['idle_s']} for r in rows],
+                     hide_index=True, use_container_width=True)
+    if st.button("放置セッションを今すぐ追い出す"):
+        st.toast(f"{POOL.enforce():,} セッションを追い出しました")
+        st.rerun()
+
+def show_profiler():
+    # 有効/無効は PROFILER だけが持つ (ウィジェットの状態とは突き合わせない)
+    st.subheader("計測")
+    c1, c2, c3 = st.columns(3)
+    if PROFILER.enabled:
+        if c1.button("計測を止める"):
+            PROFILER.disable()
+            st.rerun()
+    elif c1.button("計測を始める", help="エンジン呼び出しと画面の各部分の時間を集計します (全セッション共通)"):
+        PROFILER.enable()
+        st.rerun()
+    if c2.button("リセット"):
+        PROFILER.reset()
+        st.rerun()
+    c3.download_button("JSON", PROFILER.to_json(), file_name="idol_profile.json", mime="application/json")
+    rows = PROFILER.rows()
+    if rows:
+        st.dataframe([{'phase': n, 'calls': c, 'total ms': t, 'mean us': m, 'max ms': x} for n, c, t, m, x in rows],
+                     hide_index=True, use_container_width=True)
+    elif not PROFILER.enabled:
+        st.caption("計測は無効です (IDOL_PROFILE=1 で起動すると最初から有効)")
+
+def authorized():
+    token = os.environ.get("IDOL_ADMIN_TOKEN", "")
+    if not token:
+        st.info("管理ページは無効です (環境変数 IDOL_ADMIN_TOKEN を設定すると使えます)")
+        return False
+    entered = st.text_input("管理トークン", type="password", key="admin_token")
+    if not entered: return False
+    if not hmac.compare_digest(entered.encode(), token.encode()):
+        st.error("トークンが違います")
+        return False
+    return True
+
+st.set_page_config(layout="wide", page_title="Idol Admin")
+st.title("セッション管理")
+if not authorized(): st.stop()
+show_pool()
+show_profiler()
@@ -0,0 +1,126 @@
+# 分析ページ: シミュレーション / リプレイを idol_analytics で集計して表示する
+import collections
+import os
+import sys
+import threading
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idol_engine import get_all_drinks, get_all_p_items, get_template_decks
+from idol_analytics import Aggregator, export_zip, replay_games, simulate_games
+from idol_sim import POLICIES, build_loadout
+
+# ページ上の集計は同期で走るので件数に上限を置き、同じ条件の結果はキャッシュから返す
+# (これより多いゲームは CLI の python idol_analytics.py で集計する)
+MAX_GAMES = 20_000
+CACHE_ENTRIES = 16
+
+DEFAULT_REPLAYS = os.environ.get("IDOL_REPLAY_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "replays", "games.idr"))
+
+@st.cache_resource
+def result_cache():
+    """(source, params) -> (ゲーム数, 平均スコア, tables)。全セッションで共有し、古いものから捨てる
+    (集計中に進捗バーを出すので st.cache_data ではなく自前で持つ)"""
+    return collections.OrderedDict(), threading.Lock()
+
+def aggregate(source, params, progress=None):
+    """(ゲーム数, 平均スコア, tables)。source と params が同じならキャッシュから返す"""
+    (cache, lock), key = result_cache(), (source, params)
+    with lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    if source == 'sim':
+        deck, policy, n_games, seed, items, drinks = params
+        loadout = build_loadout(get_template_decks()[deck], 'shuki_kotone', items, drinks)
+        games = simulate_games(loadout, POLICIES[policy], n_games, seed)
+    else:
+        path, _mtime, n_games = params
+        games = replay_games(path, n_games)
+    agg = Aggregator().consume(games, progress=progress)
+    result = (agg.games, agg.total_score / max(agg.games, 1), agg.tables())
+    with lock:
+        cache[key] = result
+        while len(cache) > CACHE_ENTRIES: cache.popitem(last=False)
+    return result
+
+def run_analysis():
+    st.subheader("入力")
+    source = st.radio("データ", ["シミュレーション", "リプレイファイル"], horizontal=True, key="an_source")
+    if source == "シミュレーション":
+        c1, c2, c3, c4 = st.columns(4)
+        deck = c1.selectbox("デッキ", list(get_template_decks()), key="an_deck")
+        policy = c2.selectbox("方針", sorted(POLICIES), index=sorted(POLICIES).index('first'), key="an_policy")
+        n_games = c3.number_input("ゲーム数", 100, MAX_GAMES, 5000, step=1000, key="an_games")
+        seed = c4.number_input("シード", 0, 2**31 - 1, 0, key="an_seed")
+        items = st.multiselect("Pアイテム", list(get_all_p_items()), key="an_items")
+        drinks = st.multiselect("ドリンク (最大3つ)", list(get_all_drinks()), max_selections=3, key="an_drinks")
+        label = f"{deck} / {policy} / {n_games:,} games"
+        source, params = 'sim', lambda: (deck, policy, n_games, seed, tuple(items), tuple(drinks))
+    else:
+        path = st.text_input("リプレイファイル", DEFAULT_REPLAYS, key="an_path")
+        n_games = st.number_input("最大件数", 100, MAX_GAMES, 10_000, step=1000, key="an_limit")
+        label = f"{os.path.basename(path)} (最大 {n_games:,} 件)"
+        # ファイルが書き足されたら別の結果になるよう、更新時刻もキーに含める
+        source, params = 'replay', lambda: (path, os.path.getmtime(path), n_games)
+    st.caption(f"ページ上では最大 {MAX_GAMES:,} ゲームまで (それ以上は python idol_analytics.py で集計)")
+
+    if st.button("集計", type="primary"):
+        bar = st.progress(0.0, text="集計中...")
+        try:
+            games, mean, tables = aggregate(source, params(),
+                                            progress=lambda i: bar.progress(min(i / n_games, 1.0), text=f"{i:,} games"))
+        except (OSError, ValueError) as e:
+            bar.empty()
+            st.error(f"集計できませんでした: {e}")
+            return
+        bar.empty()
+        st.session_state.analytics = (label, games, mean, tables)
+
+def heatmap(table, index):
+    df = pd.DataFrame(table).set_index(index)
+    return df.style.background_gradient(axis=None, cmap='Blues').format("{:.2f}")
+
+def show_results():
+    result = st.session_state.get("analytics")
+    if result is None:
+        st.caption("「集計」を押すと結果が表示されます")
+        return
+    label, games, mean, tables = result
+    st.subheader(f"結果: {label}")
+    c1, c2 = st.columns(2)
+    c1.metric("ゲーム数", f"{games:,}")
+    c2.metric("平均スコア", f"{mean:,.0f}")
+
+    cards = pd.DataFrame(tables['cards'])
+    st.markdown("#### カード別 (使用率・得点寄与)")
+    st.caption("marginal_score は使ったゲームと使わなかったゲームの平均スコアの差 (相関であって因果ではない)")
+    st.dataframe(cards, hide_index=True, use_container_width=True)
+    st.bar_chart(cards.dropna(subset=['marginal_score']).set_index('card')['marginal_score'])
+
+    st.markdown("#### カード × ターン (1ゲームあたりの使用回数)")
+    st.dataframe(heatmap(tables['card_turns'], 'card'), use_container_width=True)
+    st.markdown("#### カード × 属性 (1ゲームあたりの直接得点)")
+    st.dataframe(heatmap(tables['card_genres'], 'card'), use_container_width=True)
+
+    st.markdown("#### ターン別")
+    turns = pd.DataFrame(tables['turns']).set_index('turn')
+    st.line_chart(turns['mean_score'])
+    st.dataframe(turns, use_container_width=True)
+    st.markdown("#### ターン別獲得スコアのヒストグラム (ゲーム数)")
+    st.dataframe(pd.DataFrame(tables['turn_histogram']).set_index('bin_low').style.background_gradient(axis=None, cmap='Greens'),
+                 use_container_width=True)
+
+    if tables['drinks']['drink']:
+        st.markdown("#### ドリンクの使用タイミング (1ゲームあたりの使用回数)")
+        st.dataframe(heatmap(tables['drinks'], 'drink'), use_container_width=True)
+
+    st.download_button("CSV (zip) をダウンロード", export_zip(tables), file_name="idol_analytics.zip", mime="application/zip")
+
+st.set_page_config(layout="wide", page_title="Idol Analytics")
+st.title("分析")
+run_analysis()
+show_results()
@@ -0,0 +1,70 @@
+# CardSpec (ロード時に解析したフラグ) で分岐するエンジンが、カードの種類・コスト・名前で分岐していた
+# 以前の処理と同じスコアになるか
+import math
+import random
+
+import pytest
+
+from idol_engine import GameState, get_all_drinks, get_template_decks
+from idol_sim import MAX_ACTIONS_PER_GAME, POLICIES, build_loadout
+
+GAMES = 30
+
+class OpPathState(GameState):
+    """CardSpec を使わない以前の _resolve_card (固定P は1単位ずつ calculate_score(3) を呼ぶ)"""
+    def _resolve_card(self, card):
+        self.last_card_type = card.card_type
+        if card.cost_type == 'conc':
+            self.concentration -= card.cost_value
+        else:
+            actual = card.cost_value
+            if self.energy >= actual:
+                self.energy -= actual
+            else:
+                remain = actual - self.energy
+                self.energy = 0
+                self.hp = max(0, self.hp - remain)
+        boost = 1.5 if self.buffs['conc_boost'] > 0 else 1.0
+        if card.card_type == 'mental' and self.permanent_buffs['mental_conc'] > 0:
+            self.concentration += math.ceil(self.permanent_buffs['mental_conc'] * boost)
+        if card.card_type == 'active' and self.permanent_buffs['active_conc'] > 0:
+            self.concentration += math.ceil(self.permanent_buffs['active_conc'] * boost)
+
+        repeats = 1
+        if self.double_charges > 0:
+            repeats = 2
+            self.double_charges -= 1
+        elif self.double_next_mental_only and card.card_type == 'mental':
+            repeats = 2
+            self.double_next_mental_only = False
+        for _ in range(repeats):
+            if card.card_type == 'active' and card.name != "至高のエンタメ":
+                for _ in range(self.permanent_buffs['active_score_fixed'] // 3): self.calculate_score(3)
+            self.run_ops(card.effects)
+
+        if card.is_once: self.exile.append(card)
+        else: self.discard.append(card)
+        if self.summer_memory_active:
+            self.skill_use_count += 1
+            if self.skill_use_count % 5 == 0: self.calculate_score(4)
+        for i, p in enumerate(self.p_items):
+            if p.trigger_type == 'after_action': p.check(self, i)
+        self.actions_remaining -= 1
+
+def play(cls, loadout, policy, seed):
+    char, deck, p_items, drinks = loadout
+    rng = random.Random(seed)
+    s = cls(char, deck, p_items, drinks=drinks, verbose=False, rng=rng)
+    s.start_turn()
+    for _ in range(MAX_ACTIONS_PER_GAME):
+        if s.is_game_over(): break
+        if not s.apply_action(policy(s, rng)): s.apply_action(('end',))
+    return s.score
+
+@pytest.mark.parametrize('policy_name', ['first', 'greedy'])
+@pytest.mark.parametrize('deck', sorted(get_template_decks()))
+def test_spec_path_matches_op_path(deck, policy_name):
+    loadout = build_loadout(get_template_decks()[deck], drink_names=tuple(sorted(get_all_drinks()))[:3])
+    policy = POLICIES[policy_name]
+    for i in range(GAMES):
+        assert play(GameState, loadout, policy, i) == play(OpPathState, loadout, policy, i), (deck, i)
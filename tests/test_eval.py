@@ -0,0 +1,17 @@
+# 行動列の評価器 (idol_eval)
+from idol_engine import get_template_decks
+from idol_eval import LineEvaluator, greedy_line
+from idol_sim import build_loadout
+
+def test_repeated_evaluations_keep_state_small():
+    template = get_template_decks()["理想"]
+    char, _, p_items, _ = build_loadout(template)
+    turn_info = [{'genre': 'dance', 'weight': w} for w in (19, 8, 14, 19, 8, 14, 19, 8, 14, 14, 14, 20)]
+    ev = LineEvaluator(char, p_items, turn_info)
+    line, score = greedy_line(ev, template)
+    for _ in range(200):
+        ev.memo.clear()  # メモを外して、毎回 _resolve_card まで通す
+        assert greedy_line(ev, template) == (line, score)
+        s = ev.state
+        assert len(s.hand) + len(s.discard) + len(s.exile) <= 2
+    assert ev.evaluate(line) == score
@@ -0,0 +1,53 @@
+# FastGameState が GameState と同じ乱数で同じ最終スコアになるか
+import itertools
+
+import pytest
+
+from idol_engine import get_all_p_items, get_all_drinks, get_template_decks
+from idol_engine.fast import compile_ops, compile_condition
+from idol_sim import POLICIES, check_parity
+
+DECK = "理想"
+GAMES = 10
+
+def item_sets():
+    items = sorted(get_all_p_items())
+    return [()] + [(i,) for i in items] + [tuple(items[:2])]
+
+@pytest.mark.parametrize('policy_name', sorted(POLICIES))
+@pytest.mark.parametrize('item_names', item_sets())
+def test_scores_match(policy_name, item_names):
+    drinks = tuple(sorted(get_all_drinks()))
+    for drink_names in ((), drinks):
+        mismatches = check_parity(get_template_decks()[DECK], GAMES, 0, 'shuki_kotone', item_names, drink_names, policy_name)
+        assert mismatches == [], mismatches[:3]
+
+def test_all_templates_match():
+    for name, deck_list in get_template_decks().items():
+        assert check_parity(deck_list, GAMES, 1) == [], name
+
+def test_compile_ops_is_cached_and_validates():
+    ops = (('energy', 2), ('hp', -1))
+    assert compile_ops(ops) is compile_ops(ops)
+    with pytest.raises(ValueError): compile_ops((('no_such_op', 1),))
+    with pytest.raises(ValueError): compile_ops((('set', 'no_such_attr', 1),))
+    with pytest.raises(ValueError): compile_condition(('no_such_condition',))
+
+def test_branch_leaves_state_and_rng_untouched():
+    import random
+    from idol_engine.fast import FastGameState, compile_loadout
+    from idol_sim import build_loadout
+    s = FastGameState(compile_loadout(build_loadout(get_template_decks()[DECK])), random.Random(3))
+    s.start_turn()
+    # 山札を空にして、複製のドローでシャッフルが起きるようにする
+    s.discard.extend(s.deck)
+    s.deck = []
+    before, rng_state = s.snapshot(), s.rng.getstate()
+    b = s.branch()
+    b.draw_cards(2)
+    b.apply_action(('end',))
+    assert s.snapshot() == before and s.rng.getstate() == rng_state
+    # 複製の結果は snapshot / restore で同じ手を進めた結果と同じ
+    s.draw_cards(2)
+    s.apply_action(('end',))
+    assert s.snapshot()[:-1] == b.snapshot()[:-1] and s.rng.getstate() == b.rng.getstate()
@@ -0,0 +1,64 @@
+# 画面 (idol_game) の操作とセッションプールの追い出し
+import os
+import random
+
+from streamlit.testing.v1 import AppTest
+
+from idol_engine import GameState, get_characters
+from idol_sessions import POOL
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "idol_game.py")
+
+def click(at, label):
+    next(b for b in at.button if b.label == label and not b.disabled).click()
+    at.run()
+    assert not at.exception
+
+def start_game(seed=0):
+    random.seed(seed)  # ゲームのシードは random.getrandbits で決まる (同じプロセスで動くので固定できる)
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    next(sb for sb in at.selectbox if "理想" in sb.options).select("理想")
+    click(at, "読込")
+    click(at, "ゲーム開始")
+    assert at.session_state.game_state == 'playing'
+    return at
+
+def replayed(replay, actions):
+    # idol_game.rebuild_game と同じ手順で、リプレイだけから作り直す
+    seed, char_key, deck, p_items, drinks = replay
+    s = GameState(get_characters()[char_key], deck, p_items, drinks=drinks, verbose=False, rng=random.Random(seed))
+    s.start_turn()
+    for action in actions:
+        if action[0] == 'card': s.play_card(action[1])
+        elif action[0] == 'drink': s.use_drink(action[1])
+        else:
+            s.end_turn()
+            s.start_turn()
+    return s
+
+def signature(s):
+    return s.turn, s.score, s.hp, s.energy, [c.name for c in s.hand], [d.name for d in s.drinks]
+
+def test_action_after_eviction_matches_replay(monkeypatch):
+    at = start_game()
+    key = at.session_state.session_key
+    get = POOL.get
+    evict = []
+
+    def get_then_evict(k):
+        # 描画の最初の game_slot() の直後に追い出す (操作の処理中に別のセッションが予算を使い切った状況)
+        slot = get(k)
+        if evict and k == key:
+            evict.clear()
+            POOL.drop(k)
+        return slot
+
+    monkeypatch.setattr(POOL, 'get', get_then_evict)
+    for label in ("使用", "ターン終了", "使用"):
+        evict.append(True)
+        click(at, label)
+        actions = at.session_state.replay_actions
+        slot = get(key)
+        assert signature(slot['game']) == signature(replayed(at.session_state.replay, actions))
+        assert len(slot['undo_stack']) <= len(actions)
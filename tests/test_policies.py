@@ -0,0 +1,43 @@
+# 方針の登録表と先読み方針の補助関数
+import random
+
+import pytest
+
+from idol_engine import GameState, get_template_decks
+from idol_policies import heavy_turn
+from idol_sim import FAST_POLICIES, POLICIES, build_loadout, main
+from idol_tournament import make_policy
+
+def schedule(weights):
+    return [{'genre': 'dance', 'weight': w} for w in weights]
+
+def state_at(turn, weights):
+    char, deck, p_items, drinks = build_loadout(get_template_decks()["理想"])
+    s = GameState(char, deck, p_items, drinks, verbose=False, rng=random.Random(0), turn_info=schedule(weights))
+    s.turn = turn
+    return s
+
+def test_registry_is_shared():
+    assert {'random', 'first', 'greedy', 'conc', 'timing', 'rules'} <= set(POLICIES)
+    assert set(FAST_POLICIES) == set(POLICIES)
+
+@pytest.mark.parametrize('turn, expected', [
+    (1, False),   # 最大倍率でも、同じ倍率のターンが後に残っている
+    (3, False),   # 後により大きい倍率がある
+    (6, True),    # この後のどのターンよりも大きい
+    (11, True),   # 残り2ターン
+])
+def test_heavy_turn_compares_with_later_turns(turn, expected):
+    weights = [19, 19, 8, 8, 14, 19, 8, 8, 14, 14, 14, 8]
+    weights[5] = 20
+    assert heavy_turn(state_at(turn, weights)) is expected
+
+def test_make_policy():
+    assert make_policy('greedy') is FAST_POLICIES['greedy']
+    assert make_policy(('rules', {'hp': 2.0})).rules['hp'] == 2.0
+    with pytest.raises(ValueError): make_policy('no_such_policy')
+    with pytest.raises(ValueError): make_policy(('rules', {'no_such_rule': 1}))
+
+def test_batch_engine_rejects_lookahead_policies(capsys):
+    with pytest.raises(SystemExit): main(['--engine', 'batch', '--policy', 'greedy', '-n', '10'])
+    assert "first, random" in capsys.readouterr().err